@@ -0,0 +1,382 @@
+"""Offline benchmark of the Alexa Time Control enforcement hot path.
+
+Drives the state change dispatcher, the playback handler and the
+announce-and-stop pipeline with synthetic state change streams against a
+local stand-in for hass, with stub states, config entries and service
+registry. No Home Assistant instance is started, but the homeassistant
+package must be importable.
+
+Usage:
+    python benchmarks/bench_enforcement.py [--devices 1 100 1000] [--rounds 20]
+        [--attribute-updates 10]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Callable, Coroutine
+from dataclasses import dataclass, field
+from datetime import time as dt_time
+import json
+import os
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.alexa_time_control import (  # noqa: E402
+    DOMAIN,
+    _async_handle_playback,
+    _async_playback_stopped,
+    _send_tts_and_stop,
+)
+from custom_components.alexa_time_control.const import (  # noqa: E402
+    CONF_STOP_RETRIES,
+    DATA_MESSAGES,
+    DATA_STORE,
+)
+from custom_components.alexa_time_control.dispatcher import (  # noqa: E402
+    AlexaStateDispatcher,
+)
+from custom_components.alexa_time_control.runtime import (  # noqa: E402
+    AlexaTimeControlData,
+)
+
+TRANSLATIONS = os.path.join(
+    os.path.dirname(__file__),
+    "..", "custom_components", "alexa_time_control", "translations", "en.json",
+)
+
+
+@dataclass(slots=True)
+class StubState:
+    """Minimal stand-in for a Home Assistant state."""
+
+    state: str
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class StubStates:
+    """State machine holding stub states."""
+
+    def __init__(self) -> None:
+        """Initialize the state machine."""
+        self._states: dict[str, StubState] = {}
+
+    def get(self, entity_id: str) -> StubState | None:
+        """Return the state of an entity."""
+        return self._states.get(entity_id)
+
+    def set(self, entity_id: str, state: str) -> None:
+        """Set the state of an entity."""
+        self._states[entity_id] = StubState(state)
+
+
+class StubServices:
+    """Service registry counting calls, with an optional simulated latency."""
+
+    def __init__(self, states: StubStates, latency: float) -> None:
+        """Initialize the service registry."""
+        self._states = states
+        self._latency = latency
+        self.calls = 0
+
+    async def async_call(
+        self,
+        domain: str,
+        service: str,
+        service_data: dict[str, Any],
+        blocking: bool = False,
+    ) -> None:
+        """Handle a service call."""
+        self.calls += 1
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        if service == "media_stop":
+            self._states.set(service_data["entity_id"], "idle")
+
+
+class StubStore:
+    """Control value store keeping everything in memory."""
+
+    def __init__(self) -> None:
+        """Initialize the store."""
+        self.data: dict[str, dict[str, Any]] = {}
+
+    def async_get(self, entry_id: str, key: str, default: Any = None) -> Any:
+        """Return a stored value of an entry."""
+        return self.data.get(entry_id, {}).get(key, default)
+
+    def async_set(self, entry_id: str, key: str, value: Any) -> None:
+        """Store a value of an entry."""
+        self.data.setdefault(entry_id, {})[key] = value
+
+
+class StubBus:
+    """Event bus keeping the last state_changed listener for direct dispatch."""
+
+    def __init__(self) -> None:
+        """Initialize the bus."""
+        self.listener: Callable[[Any], None] | None = None
+        self.event_filter: Callable[[Any], bool] | None = None
+
+    def async_listen(
+        self,
+        event_type: str,
+        listener: Callable[[Any], None],
+        event_filter: Callable[[Any], bool] | None = None,
+    ) -> Callable[[], None]:
+        """Subscribe to an event."""
+        self.listener, self.event_filter = listener, event_filter
+        return lambda: None
+
+    def async_fire(self, event: Any) -> None:
+        """Run the filter and the listener of an event, like the real bus."""
+        if self.event_filter is None or self.event_filter(event.data):
+            self.listener(event)
+
+
+class StubConfigEntries:
+    """Config entry manager returning stub entries."""
+
+    def __init__(self) -> None:
+        """Initialize the manager."""
+        self.entries: dict[str, SimpleNamespace] = {}
+
+    def async_get_entry(self, entry_id: str) -> SimpleNamespace | None:
+        """Return a config entry."""
+        return self.entries.get(entry_id)
+
+
+class StubHass:
+    """Stand-in for the parts of hass used by the enforcement path."""
+
+    def __init__(self, service_latency: float) -> None:
+        """Initialize the stand-in."""
+        with open(TRANSLATIONS, encoding="utf-8") as file:
+            templates = json.load(file)["tts"]
+        self.data: dict[str, Any] = {
+            DOMAIN: {},
+            DATA_MESSAGES: {"en": templates},
+            DATA_STORE: StubStore(),
+        }
+        self.bus = StubBus()
+        self.states = StubStates()
+        self.services = StubServices(self.states, service_latency)
+        self.config = SimpleNamespace(language="en")
+        self.config_entries = StubConfigEntries()
+        self.tasks: set[asyncio.Task] = set()
+        self.last_task: asyncio.Task | None = None
+
+    def async_create_task(self, target: Coroutine[Any, Any, Any]) -> asyncio.Task:
+        """Run a coroutine in a task."""
+        task = self.last_task = asyncio.get_running_loop().create_task(target)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def async_block_till_done(self) -> None:
+        """Wait for all pending tasks."""
+        while self.tasks:
+            await asyncio.gather(*self.tasks)
+
+
+def _time(minutes: int) -> dt_time:
+    """Return the time of a minute of the day."""
+    minutes %= 24 * 60
+    return dt_time(minutes // 60, minutes % 60)
+
+
+def _setup_devices(hass: StubHass, count: int) -> list[tuple[str, str]]:
+    """Configure devices, a third each blocked, outside and inside their window."""
+    now = dt_util.now()
+    current = now.hour * 60 + now.minute
+    devices = []
+
+    for index in range(count):
+        entry_id = f"entry_{index}"
+        alexa_entity_id = f"media_player.echo_{index}"
+        hass.config_entries.entries[entry_id] = SimpleNamespace(
+            entry_id=entry_id, options={CONF_STOP_RETRIES: 0}
+        )
+
+        if index % 3 == 2:
+            start, end = current - 60, current + 60
+        else:
+            start, end = current + 60, current + 120
+        hass.data[DOMAIN][entry_id] = AlexaTimeControlData(
+            entry_id,
+            alexa_entity_id,
+            enabled=True,
+            blocked=index % 3 == 0,
+            start_time=_time(start),
+            end_time=_time(end),
+            name=f"Echo {index}",
+        )
+        hass.states.set(alexa_entity_id, "idle")
+        devices.append((entry_id, alexa_entity_id))
+
+    return devices
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """Return a percentile of sorted values."""
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _state_event(entity_id: str, old_state: StubState, new_state: StubState) -> Any:
+    """Create a state_changed event."""
+    return SimpleNamespace(
+        data={"entity_id": entity_id, "old_state": old_state, "new_state": new_state}
+    )
+
+
+async def _async_bench_handler(
+    devices: int, rounds: int, attribute_updates: int, service_latency: float
+) -> dict[str, Any]:
+    """Benchmark the dispatcher and playback handler for a number of devices.
+
+    Every round each device starts playing, reports attribute-only updates
+    and stops again. Dispatch latency covers the bus filter and listener of
+    every event. Handling latency covers a playback start or stop until its
+    handling is done, including the task a start is handed to.
+    """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    hass = StubHass(service_latency)
+    configured = _setup_devices(hass, devices)
+    dispatcher = AlexaStateDispatcher(hass, _async_handle_playback, _async_playback_stopped)
+    for entry_id, alexa_entity_id in configured:
+        dispatcher.async_add(alexa_entity_id, entry_id)
+
+    # Warm the compiled schedules
+    idle, playing = StubState("idle"), StubState("playing")
+    for _, alexa_entity_id in configured:
+        hass.bus.async_fire(_state_event(alexa_entity_id, idle, playing))
+    await hass.async_block_till_done()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    memory = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    streams = [
+        [
+            _state_event(alexa_entity_id, idle, playing),
+            *(
+                _state_event(alexa_entity_id, playing, StubState("playing", {"position": i}))
+                for i in range(attribute_updates)
+            ),
+            _state_event(alexa_entity_id, playing, idle),
+        ]
+        for _, alexa_entity_id in configured
+    ]
+
+    dispatch_latencies = []
+    handle_latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for stream in streams:
+            for index, event in enumerate(stream):
+                hass.last_task = None
+                call_started = time.perf_counter()
+                hass.bus.async_fire(event)
+                dispatch_latencies.append(time.perf_counter() - call_started)
+                if (task := hass.last_task) is not None:
+                    await task
+                if index in (0, len(stream) - 1):
+                    handle_latencies.append(time.perf_counter() - call_started)
+        await hass.async_block_till_done()
+    elapsed = time.perf_counter() - started
+
+    dispatch_latencies.sort()
+    handle_latencies.sort()
+    return {
+        "devices": devices,
+        "events": len(dispatch_latencies),
+        "events_per_sec": len(dispatch_latencies) / elapsed,
+        "dispatch_p50_us": _percentile(dispatch_latencies, 50) * 1e6,
+        "dispatch_p99_us": _percentile(dispatch_latencies, 99) * 1e6,
+        "handle_p50_us": _percentile(handle_latencies, 50) * 1e6,
+        "handle_p99_us": _percentile(handle_latencies, 99) * 1e6,
+        "memory_per_device_bytes": memory / devices,
+        "service_calls": hass.services.calls,
+    }
+
+
+async def _async_bench_pipeline(rounds: int, service_latency: float) -> dict[str, Any]:
+    """Benchmark the announce-and-stop pipeline on its own."""
+    hass = StubHass(service_latency)
+    options = {CONF_STOP_RETRIES: 0}
+    latencies = []
+    for _ in range(rounds):
+        call_started = time.perf_counter()
+        await _send_tts_and_stop(hass, "media_player.echo", "Echo, stop", options)
+        latencies.append(time.perf_counter() - call_started)
+
+    latencies.sort()
+    return {
+        "calls": rounds,
+        "p50_us": _percentile(latencies, 50) * 1e6,
+        "p99_us": _percentile(latencies, 99) * 1e6,
+    }
+
+
+async def _async_main(args: argparse.Namespace) -> None:
+    """Run the benchmarks and print the results."""
+    latency = args.service_latency / 1000
+    results = {
+        "handler": [
+            await _async_bench_handler(
+                devices, args.rounds, args.attribute_updates, latency
+            )
+            for devices in args.devices
+        ],
+        "pipeline": await _async_bench_pipeline(args.rounds * 10, latency),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(
+        f"{'devices':>8} {'events':>8} {'events/s':>12} "
+        f"{'dispatch p50/p99 us':>20} {'handle p50/p99 us':>20} {'bytes/dev':>10}"
+    )
+    for result in results["handler"]:
+        dispatch = f"{result['dispatch_p50_us']:.1f}/{result['dispatch_p99_us']:.1f}"
+        handle = f"{result['handle_p50_us']:.1f}/{result['handle_p99_us']:.1f}"
+        print(
+            f"{result['devices']:>8} {result['events']:>8} "
+            f"{result['events_per_sec']:>12.0f} {dispatch:>20} {handle:>20} "
+            f"{result['memory_per_device_bytes']:>10.0f}"
+        )
+    pipeline = results["pipeline"]
+    print(
+        f"\n_send_tts_and_stop: {pipeline['calls']} calls, "
+        f"p50 {pipeline['p50_us']:.1f} us, p99 {pipeline['p99_us']:.1f} us"
+    )
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=20, help="events per device")
+    parser.add_argument(
+        "--attribute-updates", type=int, default=10,
+        help="attribute-only updates per playback",
+    )
+    parser.add_argument(
+        "--service-latency", type=float, default=0.0,
+        help="simulated latency of each service call in milliseconds",
+    )
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    asyncio.run(_async_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
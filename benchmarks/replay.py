@@ -0,0 +1,182 @@
+"""Replay recorded Alexa Time Control state changes through the decision logic.
+
+Reads a recording made with the alexa_time_control.start_recording service
+and runs its state changes through the playback filter, the usage accounting
+and the decision logic as fast as possible, with a virtual clock following
+the recorded times. Every decision is printed as a JSON line, followed by
+the decision counts and the throughput. Options given with --options replace
+the recorded ones of every device, e.g. to try a schedule change against
+real traffic; an exception calendar file in the options is read from this
+machine. Timers are not replayed, so decisions are made when playback
+starts only.
+
+Usage:
+    python benchmarks/replay.py recording.jsonl [--options '{"daily_budget": 60}']
+        [--quiet]
+"""
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from datetime import datetime, time as dt_time, tzinfo
+import json
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+from bench_enforcement import DATA_MESSAGES, DOMAIN, StubHass
+
+from homeassistant.util import dt as dt_util
+
+import custom_components.alexa_time_control as integration
+from custom_components.alexa_time_control import (
+    _async_evaluate,
+    _async_get_usage,
+    _async_playback_stopped,
+)
+from custom_components.alexa_time_control.const import CONF_EXCEPTIONS_FILE
+from custom_components.alexa_time_control.exception_calendar import (
+    load_exception_calendar,
+)
+from custom_components.alexa_time_control.runtime import (
+    AlexaTimeControlData,
+)
+
+
+class VirtualClock:
+    """Clock set to the time of the event being replayed."""
+
+    perf_counter = staticmethod(time.perf_counter)
+
+    def __init__(self) -> None:
+        """Initialize the clock."""
+        self.now = dt_util.now()
+
+    def monotonic(self) -> float:
+        """Return the virtual time as monotonic seconds."""
+        return self.now.timestamp()
+
+    def time(self) -> float:
+        """Return the virtual time as a timestamp."""
+        return self.now.timestamp()
+
+    def local_now(self, time_zone: tzinfo | None = None) -> datetime:
+        """Return the virtual time in the recorded time zone."""
+        return self.now
+
+
+CLOCK = VirtualClock()
+
+
+def _apply_controls(data: AlexaTimeControlData, controls: dict[str, Any]) -> None:
+    """Apply recorded control values, dropping the schedule if times changed."""
+    start_time = dt_time.fromisoformat(controls["start_time"])
+    end_time = dt_time.fromisoformat(controls["end_time"])
+    if start_time != data.start_time or end_time != data.end_time:
+        data.start_time, data.end_time = start_time, end_time
+        data.schedule = None
+        data.schedule_state = None
+    data.enabled = controls["enabled"]
+    data.blocked = controls["blocked"]
+    data.name = controls["name"]
+
+
+def replay(path: str, options: dict[str, Any] | None, quiet: bool) -> dict[str, Any]:
+    """Replay a recording and return the decision counts and throughput."""
+    hass = StubHass(0)
+    templates = hass.data[DATA_MESSAGES]["en"]
+    decisions: Counter[str] = Counter()
+    events = filtered = 0
+
+    started = time.perf_counter()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            # Recordings made before groups existed key the lines by entry
+            device_key = record.get("device") or record["entry_id"]
+
+            if record["type"] == "entry":
+                # Every device gets an entry of its own, as the options of
+                # the devices of a group are recorded for each of them
+                entry_options = record["options"] if options is None else options
+                hass.config_entries.entries[device_key] = SimpleNamespace(
+                    entry_id=device_key, options=entry_options
+                )
+                data = hass.data[DOMAIN][device_key] = AlexaTimeControlData(
+                    device_key, record["entity_id"]
+                )
+                if path := entry_options.get(CONF_EXCEPTIONS_FILE):
+                    data.exceptions = load_exception_calendar(path).index_for(
+                        data.alexa_entity_id
+                    )
+                if (name := record.get("time_zone")) and (
+                    time_zone := dt_util.get_time_zone(name)
+                ):
+                    dt_util.set_default_time_zone(time_zone)
+                continue
+
+            if (data := hass.data[DOMAIN].get(device_key)) is None:
+                continue
+            events += 1
+            CLOCK.now = dt_util.as_local(datetime.fromisoformat(record["time"]))
+            _apply_controls(data, record["controls"])
+
+            # Same filter as the dispatcher: only playback starts and stops
+            new_playing = record["new_state"] == "playing"
+            if new_playing == (record["old_state"] == "playing"):
+                filtered += 1
+                continue
+            if not new_playing:
+                _async_playback_stopped(hass, device_key)
+                continue
+
+            # Start accounting without the budget timer of a running instance
+            _async_get_usage(hass, device_key).start(CLOCK.monotonic())
+            if (result := _async_evaluate(hass, device_key, templates)) is None:
+                continue
+            decision, message = result
+            decisions[decision] += 1
+            if not quiet:
+                print(
+                    json.dumps(
+                        {
+                            "time": record["time"],
+                            "entity_id": data.alexa_entity_id,
+                            "decision": decision,
+                            "message": message,
+                        }
+                    )
+                )
+    elapsed = time.perf_counter() - started
+
+    return {
+        "events": events,
+        "filtered": filtered,
+        "decisions": dict(decisions),
+        "seconds": elapsed,
+        "events_per_sec": events / elapsed if elapsed else None,
+    }
+
+
+def main() -> None:
+    """Parse the arguments and replay the recording."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", help="JSONL file written by start_recording")
+    parser.add_argument(
+        "--options", type=json.loads, help="options to use instead of the recorded ones"
+    )
+    parser.add_argument("--quiet", action="store_true", help="only print the summary")
+    args = parser.parse_args()
+
+    with (
+        patch.object(dt_util, "now", CLOCK.local_now),
+        patch.object(integration, "clock", CLOCK),
+    ):
+        summary = replay(args.recording, args.options, args.quiet)
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,251 +1,795 @@
 """The Alexa Time Control integration."""
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Mapping
+from datetime import datetime, timedelta
+from functools import partial
 import logging
-from datetime import datetime, time
+# The time platform module shadows a plain "import time" in this package
+import time as clock
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import EVENT_HOMEASSISTANT_STARTED, Platform
-from homeassistant.core import Event, HomeAssistant, callback
-from homeassistant.helpers import device_registry as dr, entity_registry as er, discovery_flow
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.const import Platform
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.event import async_call_later, async_track_point_in_utc_time
+from homeassistant.helpers.start import async_at_started
+from homeassistant.util import dt as dt_util
+
+from .const import (
+    CONF_ALEXA_ENTITY_IDS,
+    CONF_ANNOUNCE_BURST,
+    CONF_ANNOUNCE_COOLDOWN,
+    CONF_ANNOUNCE_RATE,
+    CONF_DAILY_BUDGET,
+    CONF_ENFORCEMENT_ORDER,
+    CONF_EXCEPTIONS_FILE,
+    CONF_MESSAGE_PREFIX,
+    CONF_SCHEDULE_PREFIX,
+    CONF_STOP_RETRIES,
+    CONF_STOP_TIMEOUT,
+    CONF_TTS_TIMEOUT,
+    DATA_DISCOVERY,
+    DATA_DISPATCHER,
+    DATA_EXCEPTIONS,
+    DATA_STORE,
+    DEFAULT_ANNOUNCE_BURST,
+    DEFAULT_ANNOUNCE_COOLDOWN,
+    DEFAULT_ANNOUNCE_RATE,
+    DEFAULT_ENFORCEMENT_ORDER,
+    DEFAULT_STOP_RETRIES,
+    DEFAULT_STOP_TIMEOUT,
+    DEFAULT_TTS_TIMEOUT,
+    ORDER_CONCURRENT,
+    ORDER_STOP_FIRST,
+    SIGNAL_CONTROL_UPDATED,
+    STOP_VERIFY_DELAY,
+)
+from .discovery import AlexaDiscovery
+from .dispatcher import AlexaStateDispatcher
+from .exception_calendar import async_get_exception_calendar
+from .messages import (
+    MESSAGE_BLOCKED,
+    MESSAGE_BUDGET_EXHAUSTED,
+    MESSAGE_TIME_RESTRICTED,
+    async_get_message_templates,
+    render_message,
+)
+from .metrics import (
+    DECISION_ALLOWED,
+    DECISION_BLOCKED,
+    DECISION_BUDGET_EXHAUSTED,
+    DECISION_DISABLED,
+    DECISION_TIME_RESTRICTED,
+)
+from .ratelimit import AnnouncementThrottle
+from .runtime import AlexaTimeControlData, entry_device_keys
+from .schedule import (
+    WEEKDAYS,
+    ScheduleState,
+    WeeklySchedule,
+    format_minute,
+    minute_of_day,
+    parse_windows,
+)
+from .services import async_setup_services
+from .store import AlexaTimeControlStore
+from .usage import PlaybackUsage, day_position
 
 _LOGGER = logging.getLogger(__name__)
 
 DOMAIN = "alexa_time_control"
-PLATFORMS: list[Platform] = [Platform.TIME, Platform.SWITCH, Platform.TEXT]
+PLATFORMS: list[Platform] = [Platform.TIME, Platform.SWITCH, Platform.TEXT, Platform.SENSOR]
 
 
 async def async_setup(hass: HomeAssistant, config: dict) -> bool:
     """Set up the Alexa Time Control component."""
-    
-    async def async_discover_alexa_devices(event: Event) -> None:
-        """Discover Alexa media players and create discovery flows."""
-        # Get all media player entities
-        states = hass.states.async_all("media_player")
-        
-        # Get already configured entities
-        current_entries = hass.config_entries.async_entries(DOMAIN)
-        configured_entities = {entry.data.get("alexa_entity_id") for entry in current_entries}
-        
-        # Find Alexa media players
-        for state in states:
-            # Check if it's an Alexa device
-            if "alexa" in state.entity_id.lower() or state.attributes.get("integration") == "alexa_media":
-                # Skip if already configured
-                if state.entity_id not in configured_entities:
-                    discovery_flow.async_create_flow(
-                        hass,
-                        DOMAIN,
-                        context={"source": "discovery"},
-                        data={"alexa_entity_id": state.entity_id},
-                    )
-    
+    hass.data[DATA_DISPATCHER] = AlexaStateDispatcher(
+        hass, _async_handle_playback, _async_playback_stopped
+    )
+    store = hass.data[DATA_STORE] = AlexaTimeControlStore(hass)
+    await store.async_load()
+    async_setup_services(
+        hass, _async_controls_updated, _async_get_schedule, _async_reload_exceptions
+    )
+
+    discovery = hass.data[DATA_DISCOVERY] = AlexaDiscovery(hass)
+    discovery.async_start()
+
+    @callback
+    def async_discover_alexa_devices(hass: HomeAssistant) -> None:
+        """Create discovery flows for the Alexa media players found so far."""
+        discovery.async_discover_all()
+
     # Schedule discovery after Home Assistant has started
-    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, async_discover_alexa_devices)
-    
+    async_at_started(hass, async_discover_alexa_devices)
+
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-    """Set up Alexa Time Control from a config entry."""
+    """Set up Alexa Time Control from a config entry.
+
+    Every media player of the entry gets its own runtime state, the
+    platforms and entry listeners are set up once for all of them.
+    """
     hass.data.setdefault(DOMAIN, {})
-    hass.data[DOMAIN][entry.entry_id] = {
-        "alexa_entity_id": entry.data["alexa_entity_id"],
-        "listeners": []
-    }
+    device_keys = entry_device_keys(entry)
+    for alexa_entity_id, device_key in device_keys.items():
+        hass.data[DOMAIN][device_key] = AlexaTimeControlData.restore(
+            entry.entry_id, device_key, alexa_entity_id, hass.data[DATA_STORE]
+        )
+        hass.data[DATA_DISCOVERY].configured.add(alexa_entity_id)
+        _async_resolve_device_info(hass, device_key)
+        try:
+            await _async_load_exceptions(hass, device_key)
+        except ValueError as err:
+            _LOGGER.error("Error loading exceptions: %s", err)
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    # Set up state listener after entities are created
-    async def async_setup_listener(event):
-        """Set up the state listener after entities are ready."""
-        await _async_setup_state_listener(hass, entry)
+    for device_key in device_keys.values():
+        hass.data[DOMAIN][device_key].listeners.extend(
+            _async_track_device(hass, device_key)
+        )
+    entry.async_on_unload(
+        async_dispatcher_connect(
+            hass,
+            SIGNAL_CONTROL_UPDATED.format(entry.entry_id),
+            partial(_async_control_updated, hass, entry),
+        )
+    )
+    entry.async_on_unload(entry.add_update_listener(_async_options_updated))
 
-    hass.bus.async_listen_once("homeassistant_started", async_setup_listener)
+    # Set up the state listeners right away if Home Assistant is already
+    # running, otherwise once it has started and all entities are ready
+    entry.async_on_unload(
+        async_at_started(hass, partial(_async_setup_state_listeners, entry=entry))
+    )
 
     return True
 
 
-async def _async_setup_state_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Set up the state change listener for the Alexa device."""
-    alexa_entity_id = entry.data["alexa_entity_id"]
-    entry_id = entry.entry_id
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate an old config entry."""
+    if entry.version == 1:
+        # Entries control a list of media players since version 2
+        data = dict(entry.data)
+        data[CONF_ALEXA_ENTITY_IDS] = [data.pop("alexa_entity_id")]
+        hass.config_entries.async_update_entry(entry, data=data, version=2)
+        _LOGGER.debug("Migrated %s to version 2", entry.title)
 
-    @callback
-    async def async_state_changed(event):
-        """Handle state changes of the Alexa media player."""
-        new_state = event.data.get("new_state")
-        old_state = event.data.get("old_state")
+    return True
 
-        if new_state is None or new_state.state != "playing":
-            return
 
-        if old_state and old_state.state == "playing":
-            return
+@callback
+def _async_setup_state_listeners(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Set up the state change listeners for the Alexa devices of an entry."""
+    dispatcher: AlexaStateDispatcher = hass.data[DATA_DISPATCHER]
+    for alexa_entity_id, device_key in entry_device_keys(entry).items():
+        entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+
+        # Guard against activating twice, e.g. by a late started event
+        if entry_data.listening:
+            continue
+
+        entry_data.listeners.extend(
+            [
+                dispatcher.async_add(alexa_entity_id, device_key),
+                partial(_async_cancel_boundary_timer, hass, device_key),
+                partial(_async_cancel_budget_timer, hass, device_key),
+            ]
+        )
+        entry_data.listening = True
+        _async_schedule_boundary_timer(hass, device_key)
+
+        # Account and check a playback that was already running
+        state = hass.states.get(alexa_entity_id)
+        if state and state.state == "playing":
+            _async_playback_started(hass, device_key)
+            hass.async_create_task(_async_check_active_playback(hass, device_key))
+
+
+async def _async_handle_playback(hass: HomeAssistant, device_key: str) -> None:
+    """Account and check playback the Alexa media player just started."""
+    # The device may have been unloaded while this change was queued
+    if device_key not in hass.data[DOMAIN]:
+        return
+
+    _async_playback_started(hass, device_key)
+    await _async_check_playback(hass, device_key)
+
+
+@callback
+def _async_playback_started(hass: HomeAssistant, device_key: str) -> None:
+    """Start accounting the playback time of the Alexa media player."""
+    _async_get_usage(hass, device_key).start(clock.monotonic())
+    _async_schedule_budget_timer(hass, device_key)
+
+
+@callback
+def _async_playback_stopped(hass: HomeAssistant, device_key: str) -> None:
+    """Stop accounting the playback time and store the day's total."""
+    usage = _async_get_usage(hass, device_key)
+    usage.stop(clock.monotonic())
+    _async_cancel_budget_timer(hass, device_key)
+    hass.data[DATA_STORE].async_set(device_key, "usage", usage.as_dict())
+
+
+@callback
+def _async_get_usage(hass: HomeAssistant, device_key: str) -> PlaybackUsage:
+    """Return the playback usage of a device, rolled over to the current day."""
+    usage: PlaybackUsage = hass.data[DOMAIN][device_key].usage
+    if usage.roll(*day_position(dt_util.now()), clock.monotonic()):
+        hass.data[DATA_STORE].async_set(device_key, "usage", usage.as_dict())
+    return usage
+
+
+@callback
+def _async_schedule_budget_timer(hass: HomeAssistant, device_key: str) -> None:
+    """Schedule a check for when the daily budget of a playing device runs out."""
+    _async_cancel_budget_timer(hass, device_key)
+
+    entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+    entry = hass.config_entries.async_get_entry(entry_data.entry_id)
+    usage = _async_get_usage(hass, device_key)
+    if not (budget := entry.options.get(CONF_DAILY_BUDGET)) or not usage.playing:
+        return
+
+    # An exhausted budget is enforced by the check at playback start
+    if (remaining := budget * 60 - usage.used_at(clock.monotonic())) <= 0:
+        return
+
+    entry_data.budget_timer = async_call_later(
+        hass, remaining, partial(_async_budget_reached, hass, device_key)
+    )
 
-        # Get the control entities
-        entity_reg = er.async_get(hass)
-        entities = er.async_entries_for_config_entry(entity_reg, entry_id)
-
-        enabled_entity = None
-        blocked_entity = None
-        start_time_entity = None
-        end_time_entity = None
-        name_entity = None
-
-        for entity in entities:
-            if entity.unique_id.endswith("_enabled"):
-                enabled_entity = entity.entity_id
-            elif entity.unique_id.endswith("_blocked"):
-                blocked_entity = entity.entity_id
-            elif entity.unique_id.endswith("_start_time"):
-                start_time_entity = entity.entity_id
-            elif entity.unique_id.endswith("_end_time"):
-                end_time_entity = entity.entity_id
-            elif entity.unique_id.endswith("_name"):
-                name_entity = entity.entity_id
-
-        if not all([enabled_entity, blocked_entity, start_time_entity, end_time_entity]):
-            _LOGGER.warning("Not all control entities found for %s", alexa_entity_id)
-            return
 
-        # Check if enabled
-        enabled_state = hass.states.get(enabled_entity)
-        if not enabled_state or enabled_state.state != "on":
-            return
+@callback
+def _async_cancel_budget_timer(hass: HomeAssistant, device_key: str) -> None:
+    """Cancel the pending budget timer of a device."""
+    entry_data = hass.data[DOMAIN][device_key]
+    if (cancel := entry_data.budget_timer) is not None:
+        cancel()
+        entry_data.budget_timer = None
+
+
+async def _async_budget_reached(
+    hass: HomeAssistant, device_key: str, now: datetime
+) -> None:
+    """Enforce the daily budget on a device that is still playing."""
+    hass.data[DOMAIN][device_key].budget_timer = None
+    await _async_check_active_playback(hass, device_key)
+    if device_key in hass.data[DOMAIN]:
+        _async_schedule_budget_timer(hass, device_key)
+
+
+async def _async_check_playback(hass: HomeAssistant, device_key: str) -> bool:
+    """Stop playback of the Alexa media player if it is not allowed right now.
+
+    Returns whether playback was stopped.
+    """
+    templates = await async_get_message_templates(hass, hass.config.language)
+    if device_key not in hass.data[DOMAIN]:
+        return False
+
+    started = clock.perf_counter()
+    if (result := _async_evaluate(hass, device_key, templates)) is None:
+        return False
+
+    decision, message = result
+    entry_data = hass.data[DOMAIN][device_key]
+    entry_data.metrics.record_decision(decision, clock.perf_counter() - started)
+
+    # Log the decision with the window in effect. Disabled and blocked
+    # devices are decided without the schedule, its cached state may be stale
+    window = None
+    if decision not in (DECISION_DISABLED, DECISION_BLOCKED):
+        window = entry_data.schedule_state.window
+    entry_data.audit.record(clock.time(), decision, window)
+    if message is None:
+        return False
+
+    await _async_enforce(hass, device_key, message)
+    return True
 
-        # Get the name for TTS prefix
-        name_prefix = ""
-        if name_entity:
-            name_state = hass.states.get(name_entity)
-            if name_state and name_state.state:
-                name_prefix = f"{name_state.state}, "
-
-        # Check if blocked
-        blocked_state = hass.states.get(blocked_entity)
-        if blocked_state and blocked_state.state == "on":
-            message = _get_translation(hass, "blocked", name_prefix)
-            await _send_tts_and_stop(hass, alexa_entity_id, message)
-            return
 
-        # Check time constraints
-        start_time_state = hass.states.get(start_time_entity)
-        end_time_state = hass.states.get(end_time_entity)
+@callback
+def _async_evaluate(
+    hass: HomeAssistant, device_key: str, templates: Mapping[str, str]
+) -> tuple[str, str | None] | None:
+    """Decide whether the Alexa media player may play right now.
+
+    Returns the decision and the message to announce if playback has to be
+    stopped, rendered from the given templates unless the entry overrides
+    them, or None if no decision can be made.
+    """
+    entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+
+    # Check if enabled
+    if not entry_data.enabled:
+        return DECISION_DISABLED, None
+
+    entry = hass.config_entries.async_get_entry(entry_data.entry_id)
+    name = entry_data.name
+    now = dt_util.now()
+
+    # Check if blocked
+    if entry_data.blocked:
+        return DECISION_BLOCKED, _render_message(
+            entry, templates, MESSAGE_BLOCKED, name, now
+        )
+
+    # Check time constraints
+    try:
+        state = _async_get_schedule_state(hass, device_key, now)
+    except ValueError as err:
+        _LOGGER.error("Error processing time values: %s", err)
+        return None
+
+    # Check if current time is outside the allowed windows
+    if not state.allowed:
+        if state.next_start is None:
+            message = _render_message(entry, templates, MESSAGE_BLOCKED, name, now)
+        else:
+            message = _render_message(
+                entry, templates, MESSAGE_TIME_RESTRICTED, name, now,
+                format_minute(state.previous_end),
+                format_minute(state.next_start),
+            )
+        return DECISION_TIME_RESTRICTED, message
+
+    # Check the daily playback budget
+    if (budget := entry.options.get(CONF_DAILY_BUDGET)) and (
+        _async_get_usage(hass, device_key).used_at(clock.monotonic()) >= budget * 60
+    ):
+        return DECISION_BUDGET_EXHAUSTED, _render_message(
+            entry, templates, MESSAGE_BUDGET_EXHAUSTED, name, now
+        )
+
+    return DECISION_ALLOWED, None
+
+
+async def _async_enforce(hass: HomeAssistant, device_key: str, message: str) -> None:
+    """Announce the message on the Alexa media player and stop it.
+
+    The stop is always enforced, the announcement only if the device's
+    throttle lets it through.
+    """
+    entry_data = hass.data[DOMAIN][device_key]
+    entry = hass.config_entries.async_get_entry(entry_data.entry_id)
+
+    if (throttle := entry_data.throttle) is None:
+        throttle = entry_data.throttle = AnnouncementThrottle(
+            entry.options.get(CONF_ANNOUNCE_COOLDOWN, DEFAULT_ANNOUNCE_COOLDOWN),
+            int(entry.options.get(CONF_ANNOUNCE_BURST, DEFAULT_ANNOUNCE_BURST)),
+            entry.options.get(CONF_ANNOUNCE_RATE, DEFAULT_ANNOUNCE_RATE),
+        )
+    if not throttle.allow(clock.monotonic()):
+        _LOGGER.debug(
+            "Suppressing announcement on %s", entry_data.alexa_entity_id
+        )
+        message = None
+
+    latencies = await _send_tts_and_stop(
+        hass, entry_data.alexa_entity_id, message, entry.options
+    )
+    entry_data.last_enforcement = latencies
+    entry_data.metrics.record_enforcement(latencies)
 
-        if not start_time_state or not end_time_state:
-            return
 
-        try:
-            # Parse time strings (format: HH:MM:SS)
-            start_time_parts = start_time_state.state.split(":")
-            end_time_parts = end_time_state.state.split(":")
-            
-            start_hour = int(start_time_parts[0])
-            start_minute = int(start_time_parts[1]) if len(start_time_parts) > 1 else 0
-            end_hour = int(end_time_parts[0])
-            end_minute = int(end_time_parts[1]) if len(end_time_parts) > 1 else 0
-            
-            now = datetime.now()
-            current_minutes = now.hour * 60 + now.minute
-            start_minutes = start_hour * 60 + start_minute
-            end_minutes = end_hour * 60 + end_minute
-            
-            # Check if current time is outside allowed range
-            if start_minutes <= end_minutes:
-                # Normal range (e.g., 8:00 to 20:00)
-                is_outside = current_minutes < start_minutes or current_minutes >= end_minutes
-            else:
-                # Range crosses midnight (e.g., 20:00 to 8:00)
-                is_outside = current_minutes >= end_minutes and current_minutes < start_minutes
-
-            if is_outside:
-                current_time_str = now.strftime("%H:%M")
-                start_time_str = f"{start_hour:02d}:{start_minute:02d}"
-                end_time_str = f"{end_hour:02d}:{end_minute:02d}"
-                
-                message = _get_translation(
-                    hass, "time_restricted", name_prefix,
-                    current_time_str, end_time_str, start_time_str
-                )
-                await _send_tts_and_stop(hass, alexa_entity_id, message)
-
-        except (ValueError, TypeError) as err:
-            _LOGGER.error("Error processing time values: %s", err)
-
-    # Register the listener
-    remove_listener = async_track_state_change_event(
-        hass, [alexa_entity_id], async_state_changed
+@callback
+def _async_schedule_boundary_timer(hass: HomeAssistant, device_key: str) -> None:
+    """Schedule a timer for the next allowed/forbidden boundary of a device.
+
+    No timer is needed while time control is disabled or the device is
+    blocked, as the outcome cannot change until a control entity does.
+    """
+    _async_cancel_boundary_timer(hass, device_key)
+
+    entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+    if not entry_data.enabled or entry_data.blocked:
+        return
+
+    try:
+        state = _async_get_schedule_state(hass, device_key, dt_util.now())
+    except ValueError:
+        return
+
+    entry_data.boundary_timer = async_track_point_in_utc_time(
+        hass,
+        partial(_async_boundary_reached, hass, device_key),
+        state.expires,
     )
-    hass.data[DOMAIN][entry.entry_id]["listeners"].append(remove_listener)
 
 
-def _get_translation(
-    hass: HomeAssistant,
+@callback
+def _async_cancel_boundary_timer(hass: HomeAssistant, device_key: str) -> None:
+    """Cancel the pending boundary timer of a device."""
+    entry_data = hass.data[DOMAIN][device_key]
+    if (cancel := entry_data.boundary_timer) is not None:
+        cancel()
+        entry_data.boundary_timer = None
+
+
+async def _async_boundary_reached(
+    hass: HomeAssistant, device_key: str, now: datetime
+) -> None:
+    """Enforce the schedule on an already playing device at a boundary."""
+    hass.data[DOMAIN][device_key].boundary_timer = None
+    _async_schedule_boundary_timer(hass, device_key)
+    await _async_check_active_playback(hass, device_key)
+
+
+async def _async_check_active_playback(hass: HomeAssistant, device_key: str) -> bool:
+    """Check the Alexa media player if it is currently playing."""
+    if (entry_data := hass.data[DOMAIN].get(device_key)) is None:
+        return False
+    state = hass.states.get(entry_data.alexa_entity_id)
+    if state and state.state == "playing":
+        return await _async_check_playback(hass, device_key)
+    return False
+
+
+@callback
+def _async_get_schedule(
+    hass: HomeAssistant, device_key: str, now: datetime
+) -> WeeklySchedule:
+    """Return the schedule of a device for the week of a local time.
+
+    The schedule is compiled from the start/end times, the per-weekday
+    options and the exceptions falling into the week, which replace the
+    windows of their days. The Sunday before the week is looked up the same
+    way for the windows running into Monday. It is cached until one of them
+    changes or the week ends.
+    """
+    entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+    week = now.date() - timedelta(days=now.weekday())
+    if (schedule := entry_data.schedule) is not None and (
+        entry_data.schedule_week == week
+    ):
+        return schedule
+
+    default_windows = [
+        (minute_of_day(entry_data.start_time), minute_of_day(entry_data.end_time))
+    ]
+
+    entry = hass.config_entries.async_get_entry(entry_data.entry_id)
+    weekday_windows = {}
+    for day, name in enumerate(WEEKDAYS):
+        if value := entry.options.get(f"{CONF_SCHEDULE_PREFIX}{name}"):
+            weekday_windows[day] = parse_windows(value)
+    previous_windows = weekday_windows.get(6, default_windows)
+    if (exceptions := entry_data.exceptions) is not None:
+        if rule := exceptions.rule_at(week - timedelta(days=1)):
+            previous_windows = list(rule.windows)
+        for day in range(7):
+            if rule := exceptions.rule_at(week + timedelta(days=day)):
+                weekday_windows[day] = list(rule.windows)
+
+    schedule = WeeklySchedule.compile(
+        default_windows, weekday_windows, previous_windows
+    )
+    entry_data.schedule = schedule
+    entry_data.schedule_week = week
+    return schedule
+
+
+async def _async_load_exceptions(hass: HomeAssistant, device_key: str) -> None:
+    """Load the exception calendar of a device, if its entry has one.
+
+    Raises ValueError if the calendar cannot be read.
+    """
+    entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+    entry = hass.config_entries.async_get_entry(entry_data.entry_id)
+    entry_data.exceptions = None
+    if not (path := entry.options.get(CONF_EXCEPTIONS_FILE)):
+        return
+
+    calendar = await async_get_exception_calendar(hass, hass.config.path(path))
+    entry_data.exceptions = calendar.index_for(entry_data.alexa_entity_id)
+
+
+async def _async_reload_exceptions(hass: HomeAssistant, device_key: str) -> None:
+    """Read the exception calendar of a device again and apply it.
+
+    Raises ValueError if the calendar cannot be read.
+    """
+    try:
+        await _async_load_exceptions(hass, device_key)
+    finally:
+        if device_key in hass.data[DOMAIN]:
+            _async_invalidate_schedule(hass, device_key)
+            _async_reevaluate(hass, device_key)
+
+
+@callback
+def _async_get_schedule_state(
+    hass: HomeAssistant, device_key: str, now: datetime
+) -> ScheduleState:
+    """Return the state of the schedule of a device at a local time.
+
+    The state is cached until its next transition, so repeated play attempts
+    within the same window reuse it.
+    """
+    entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+    if (state := entry_data.schedule_state) is not None and now < state.expires:
+        return state
+
+    state = _async_get_schedule(hass, device_key, now).state_at(now)
+    entry_data.schedule_state = state
+    return state
+
+
+@callback
+def _async_resolve_device_info(hass: HomeAssistant, device_key: str) -> None:
+    """Resolve the device of the Alexa entity for the entities of a device."""
+    entry_data = hass.data[DOMAIN][device_key]
+    entry_data.device_id = None
+    entry_data.device_info = None
+
+    # Get the device info from the existing Alexa entity
+    alexa_entity = er.async_get(hass).async_get(entry_data.alexa_entity_id)
+    if alexa_entity and alexa_entity.device_id:
+        device = dr.async_get(hass).async_get(alexa_entity.device_id)
+        if device:
+            entry_data.device_id = device.id
+            entry_data.device_info = DeviceInfo(
+                identifiers=device.identifiers,
+            )
+
+
+@callback
+def _async_track_device(
+    hass: HomeAssistant, device_key: str
+) -> list[CALLBACK_TYPE]:
+    """Follow the device of a media player, reloading its entry when it changes.
+
+    The entities take their device link at setup, so the entry is reloaded
+    once the media player is linked to another device or its device is
+    removed.
+    """
+    entry_data = hass.data[DOMAIN][device_key]
+
+    @callback
+    def _async_device_filter(event_data: Mapping[str, Any]) -> bool:
+        """Only pass updates of the player's device."""
+        return event_data["device_id"] == entry_data.device_id
+
+    @callback
+    def _async_entity_filter(event_data: Mapping[str, Any]) -> bool:
+        """Only pass updates of the player's registry entry."""
+        return event_data["entity_id"] == entry_data.alexa_entity_id
+
+    @callback
+    def _async_registry_updated(event: Event) -> None:
+        """Resolve the device info again and reload the entry if it changed."""
+        device = entry_data.device_id, entry_data.device_info
+        _async_resolve_device_info(hass, device_key)
+        if (entry_data.device_id, entry_data.device_info) != device:
+            hass.config_entries.async_schedule_reload(entry_data.entry_id)
+
+    return [
+        hass.bus.async_listen(
+            dr.EVENT_DEVICE_REGISTRY_UPDATED,
+            _async_registry_updated,
+            event_filter=_async_device_filter,
+        ),
+        hass.bus.async_listen(
+            er.EVENT_ENTITY_REGISTRY_UPDATED,
+            _async_registry_updated,
+            event_filter=_async_entity_filter,
+        ),
+    ]
+
+
+@callback
+def _async_invalidate_schedule(hass: HomeAssistant, device_key: str) -> None:
+    """Drop the compiled schedule and its state, both are rebuilt on the next check."""
+    entry_data = hass.data[DOMAIN][device_key]
+    entry_data.schedule = None
+    entry_data.schedule_state = None
+
+
+@callback
+def _async_control_updated(hass: HomeAssistant, entry: ConfigEntry, key: str) -> None:
+    """Handle a changed control entity value, shared by the devices of an entry."""
+    for device_key in entry_device_keys(entry).values():
+        if key in ("start_time", "end_time"):
+            _async_invalidate_schedule(hass, device_key)
+        _async_reevaluate(hass, device_key)
+
+
+async def _async_controls_updated(hass: HomeAssistant, device_key: str) -> bool:
+    """Apply controls changed by a service call and enforce them right away."""
+    _async_invalidate_schedule(hass, device_key)
+    if not hass.data[DOMAIN][device_key].listening:
+        return False
+    _async_schedule_boundary_timer(hass, device_key)
+    return await _async_check_active_playback(hass, device_key)
+
+
+@callback
+def _async_reevaluate(hass: HomeAssistant, device_key: str) -> None:
+    """Reschedule the boundary timer and enforce the changed controls."""
+    # Boundaries are only tracked once the state listener is active
+    if not hass.data[DOMAIN][device_key].listening:
+        return
+    _async_schedule_boundary_timer(hass, device_key)
+    _async_schedule_budget_timer(hass, device_key)
+    hass.async_create_task(_async_check_active_playback(hass, device_key))
+
+
+async def _async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Handle updated options."""
+    # Read the calendar file again, it may have changed along with the options
+    if path := entry.options.get(CONF_EXCEPTIONS_FILE):
+        hass.data.get(DATA_EXCEPTIONS, {}).pop(hass.config.path(path), None)
+
+    for device_key in entry_device_keys(entry).values():
+        hass.data[DOMAIN][device_key].throttle = None
+        try:
+            await _async_reload_exceptions(hass, device_key)
+        except ValueError as err:
+            _LOGGER.error("Error loading exceptions: %s", err)
+
+
+def _render_message(
+    entry: ConfigEntry,
+    templates: Mapping[str, str],
     message_type: str,
-    name_prefix: str,
-    current_time: str = "",
+    name: str,
+    now: datetime,
     end_time: str = "",
     start_time: str = "",
 ) -> str:
-    """Get translated TTS message."""
-    language = hass.config.language or "en"
-    
-    messages = {
-        "en": {
-            "blocked": f"{name_prefix}, your device is currently blocked",
-            "time_restricted": (
-                f"{name_prefix}, actually it is {current_time}, "
-                f"your alexa has been enabled up to {end_time} "
-                f"and can be used at {start_time} again"
-            ),
-        },
-        "de": {
-            "blocked": f"{name_prefix}, dein Gerät ist derzeit gesperrt",
-            "time_restricted": (
-                f"{name_prefix}, es ist jetzt {current_time}, "
-                f"deine Alexa ist bis {end_time} freigeschaltet "
-                f"und kann ab {start_time} wieder benutzt werden"
-            ),
-        },
-    }
-    
-    # Default to English if language not found
-    lang_messages = messages.get(language, messages["en"])
-    return lang_messages.get(message_type, "")
-
-
-async def _send_tts_and_stop(hass: HomeAssistant, entity_id: str, message: str) -> None:
-    """Send TTS message and stop the media player."""
-    # Send TTS notification
-    await hass.services.async_call(
-        "notify",
-        entity_id.replace("media_player.", "alexa_media_"),
-        {
-            "message": message,
-            "data": {
-                "type": "tts"
-            }
-        },
-        blocking=True
+    """Render a message from the entry's own template or the translated one."""
+    template = (
+        entry.options.get(f"{CONF_MESSAGE_PREFIX}{message_type}")
+        or templates[message_type]
     )
-
-    # Stop the media player
-    await hass.services.async_call(
-        "media_player",
-        "media_stop",
-        {"entity_id": entity_id},
-        blocking=False
+    return render_message(
+        template,
+        name=name,
+        current_time=now.strftime("%H:%M"),
+        end_time=end_time,
+        start_time=start_time,
     )
 
 
+async def _send_tts_and_stop(
+    hass: HomeAssistant,
+    entity_id: str,
+    message: str | None,
+    options: Mapping[str, Any] | None = None,
+) -> dict[str, float]:
+    """Send TTS message and stop the media player.
+
+    The order of both calls, their timeouts and the number of stop retries
+    come from the entry options; without a message only the stop is sent.
+    Returns the latency of each step in seconds, "silence" being the time
+    until the first stop call completed.
+    """
+    options = options or {}
+    order = options.get(CONF_ENFORCEMENT_ORDER, DEFAULT_ENFORCEMENT_ORDER)
+    latencies: dict[str, float] = {}
+    started = clock.monotonic()
+
+    async def _async_tts() -> None:
+        """Send TTS notification."""
+        if message is None:
+            return
+        latencies["tts"] = await _async_call_with_timeout(
+            hass,
+            "notify",
+            entity_id.replace("media_player.", "alexa_media_"),
+            {
+                "message": message,
+                "data": {
+                    "type": "tts"
+                }
+            },
+            options.get(CONF_TTS_TIMEOUT, DEFAULT_TTS_TIMEOUT),
+        )
+
+    async def _async_stop() -> None:
+        """Stop the media player."""
+        latencies["stop"] = await _async_call_with_timeout(
+            hass,
+            "media_player",
+            "media_stop",
+            {"entity_id": entity_id},
+            options.get(CONF_STOP_TIMEOUT, DEFAULT_STOP_TIMEOUT),
+        )
+        latencies.setdefault("silence", clock.monotonic() - started)
+
+    async def _async_verify_stop() -> None:
+        """Stop the media player again while it reports playing."""
+        retries = int(options.get(CONF_STOP_RETRIES, DEFAULT_STOP_RETRIES))
+        attempts = 1
+        while attempts <= retries:
+            await asyncio.sleep(STOP_VERIFY_DELAY)
+            state = hass.states.get(entity_id)
+            if not state or state.state != "playing":
+                break
+            _LOGGER.debug("%s is playing again, retrying stop", entity_id)
+            await _async_stop()
+            attempts += 1
+        latencies["stop_attempts"] = attempts
+
+    async def _async_stop_and_verify() -> None:
+        """Stop the media player, retrying while it reports playing."""
+        await _async_stop()
+        await _async_verify_stop()
+
+    if order == ORDER_CONCURRENT:
+        await asyncio.gather(_async_tts(), _async_stop_and_verify())
+    elif order == ORDER_STOP_FIRST:
+        # Announce once the first stop returned, not after its verification
+        await _async_stop()
+        await _async_tts()
+        await _async_verify_stop()
+    else:
+        await _async_tts()
+        await _async_stop_and_verify()
+
+    latencies["total"] = clock.monotonic() - started
+    _LOGGER.debug("Enforcement on %s took %s", entity_id, latencies)
+    return latencies
+
+
+async def _async_call_with_timeout(
+    hass: HomeAssistant,
+    domain: str,
+    service: str,
+    service_data: dict[str, Any],
+    timeout: float,
+) -> float:
+    """Call a service, waiting at most timeout seconds, and return its latency."""
+    started = clock.monotonic()
+    try:
+        async with asyncio.timeout(timeout):
+            await hass.services.async_call(domain, service, service_data, blocking=True)
+    except TimeoutError:
+        _LOGGER.warning("Calling %s.%s timed out after %ss", domain, service, timeout)
+    except HomeAssistantError as err:
+        _LOGGER.error("Error calling %s.%s: %s", domain, service, err)
+    return clock.monotonic() - started
+
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored values of a deleted config entry."""
+    store: AlexaTimeControlStore = hass.data[DATA_STORE]
+    store.async_remove_entry(entry.entry_id)
+    for alexa_entity_id, device_key in entry_device_keys(entry).items():
+        store.async_remove_entry(device_key)
+        hass.data[DATA_DISCOVERY].configured.discard(alexa_entity_id)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    # Remove state listeners
-    for remove_listener in hass.data[DOMAIN][entry.entry_id]["listeners"]:
-        remove_listener()
+    device_keys = entry_device_keys(entry).values()
+    for device_key in device_keys:
+        entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+
+        # Remove state listeners
+        entry_data.listening = False
+        for remove_listener in entry_data.listeners:
+            remove_listener()
+        entry_data.listeners.clear()
+
+        # Store the playback time accounted so far
+        usage = entry_data.usage
+        usage.stop(clock.monotonic())
+        hass.data[DATA_STORE].async_set(device_key, "usage", usage.as_dict())
 
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        hass.data[DOMAIN].pop(entry.entry_id)
+        for device_key in device_keys:
+            hass.data[DOMAIN].pop(device_key)
 
     return unload_ok
@@ -0,0 +1,92 @@
+"""Enforcement audit log for Alexa Time Control."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Iterator
+from typing import Any, NamedTuple
+
+from homeassistant.util import dt as dt_util
+
+from .metrics import DECISIONS
+from .schedule import MINUTES_PER_DAY, WEEKDAYS, Window, format_minute
+
+# Number of decisions kept per device
+AUDIT_LOG_SIZE = 256
+
+
+class AuditRecord(NamedTuple):
+    """A single enforcement decision."""
+
+    timestamp: float
+    decision: str
+    window: Window | None
+
+    def as_dict(self, entity_id: str) -> dict[str, Any]:
+        """Return the record as a dictionary for export."""
+        return {
+            "entity_id": entity_id,
+            "time": dt_util.utc_from_timestamp(self.timestamp).isoformat(),
+            "decision": self.decision,
+            "window": None if self.window is None else {
+                "start": _format_minute_of_week(self.window[0]),
+                "end": _format_minute_of_week(self.window[1]),
+            },
+        }
+
+
+class AuditLog:
+    """Ring buffer of the latest enforcement decisions of a device.
+
+    Records are kept in preallocated typed arrays, so the memory used is
+    fixed by the capacity no matter how many decisions are recorded.
+    """
+
+    __slots__ = ("capacity", "_count", "_timestamps", "_decisions", "_starts", "_ends")
+
+    def __init__(self, capacity: int = AUDIT_LOG_SIZE) -> None:
+        """Initialize the log."""
+        self.capacity = capacity
+        self._count = 0
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._decisions = array("B", bytes(capacity))
+        self._starts = array("h", [-1]) * capacity
+        self._ends = array("h", [-1]) * capacity
+
+    def __len__(self) -> int:
+        """Return the number of records held."""
+        return min(self._count, self.capacity)
+
+    def record(self, timestamp: float, decision: str, window: Window | None) -> None:
+        """Record a decision, overwriting the oldest one if the log is full."""
+        index = self._count % self.capacity
+        self._timestamps[index] = timestamp
+        self._decisions[index] = DECISIONS.index(decision)
+        self._starts[index], self._ends[index] = window or (-1, -1)
+        self._count += 1
+
+    def __iter__(self) -> Iterator[AuditRecord]:
+        """Yield the records from oldest to newest.
+
+        Records added while iterating are not yielded and records overwritten
+        meanwhile are skipped, so consumers may yield to the event loop.
+        """
+        end = self._count
+        sequence = max(0, end - self.capacity)
+        while sequence < end:
+            # Catch up with records overwritten since the last step
+            sequence = max(sequence, self._count - self.capacity)
+            if sequence >= end:
+                break
+            index = sequence % self.capacity
+            start = self._starts[index]
+            yield AuditRecord(
+                self._timestamps[index],
+                DECISIONS[self._decisions[index]],
+                None if start < 0 else (start, self._ends[index]),
+            )
+            sequence += 1
+
+
+def _format_minute_of_week(minute: int) -> str:
+    """Format a minute of the week as "<weekday> HH:MM"."""
+    return f"{WEEKDAYS[minute // MINUTES_PER_DAY % 7]} {format_minute(minute)}"
@@ -11,7 +11,39 @@ from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 
-from .const import DOMAIN
+from .const import (
+    CONF_ALEXA_ENTITY_IDS,
+    CONF_ANNOUNCE_BURST,
+    CONF_ANNOUNCE_COOLDOWN,
+    CONF_ANNOUNCE_RATE,
+    CONF_DAILY_BUDGET,
+    CONF_ENFORCEMENT_ORDER,
+    CONF_EXCEPTIONS_FILE,
+    CONF_MESSAGE_PREFIX,
+    CONF_SCHEDULE_PREFIX,
+    CONF_STOP_RETRIES,
+    CONF_STOP_TIMEOUT,
+    CONF_TTS_TIMEOUT,
+    DEFAULT_ANNOUNCE_BURST,
+    DEFAULT_ANNOUNCE_COOLDOWN,
+    DEFAULT_ANNOUNCE_RATE,
+    DEFAULT_ENFORCEMENT_ORDER,
+    DEFAULT_STOP_RETRIES,
+    DEFAULT_STOP_TIMEOUT,
+    DEFAULT_TTS_TIMEOUT,
+    DATA_DISCOVERY,
+    DOMAIN,
+    ENFORCEMENT_ORDERS,
+)
+from .exception_calendar import load_exception_calendar
+from .messages import (
+    MESSAGE_BLOCKED,
+    MESSAGE_BUDGET_EXHAUSTED,
+    MESSAGE_TIME_RESTRICTED,
+    PLACEHOLDERS,
+    validate_template,
+)
+from .schedule import WEEKDAYS, parse_windows
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -19,12 +51,20 @@ _LOGGER = logging.getLogger(__name__)
 class AlexaTimeControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Alexa Time Control."""
 
-    VERSION = 1
+    VERSION = 2
 
     def __init__(self) -> None:
         """Initialize the config flow."""
         self._discovered_alexa_entity_id: str | None = None
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> AlexaTimeControlOptionsFlow:
+        """Get the options flow for this handler."""
+        return AlexaTimeControlOptionsFlow(config_entry)
+
     async def async_step_discovery(
         self, discovery_info: dict[str, Any]
     ) -> FlowResult:
@@ -53,7 +93,7 @@ class AlexaTimeControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         if user_input is not None:
             return self.async_create_entry(
                 title=f"Time Control - {self._discovered_alexa_entity_id.split('.')[-1]}",
-                data={"alexa_entity_id": self._discovered_alexa_entity_id},
+                data={CONF_ALEXA_ENTITY_IDS: [self._discovered_alexa_entity_id]},
             )
 
         state = self.hass.states.get(self._discovered_alexa_entity_id)
@@ -71,34 +111,46 @@ class AlexaTimeControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         errors: dict[str, str] = {}
 
         if user_input is not None:
-            alexa_entity_id = user_input["alexa_entity_id"]
-            
-            # Create unique ID based on the Alexa entity
-            await self.async_set_unique_id(alexa_entity_id)
-            self._abort_if_unique_id_configured()
+            alexa_entity_ids: list[str] = user_input[CONF_ALEXA_ENTITY_IDS]
 
-            return self.async_create_entry(
-                title=f"Time Control - {alexa_entity_id.split('.')[-1]}",
-                data=user_input,
-            )
+            if len(alexa_entity_ids) == 1:
+                # Create unique ID based on the Alexa entity
+                await self.async_set_unique_id(alexa_entity_ids[0])
+                self._abort_if_unique_id_configured()
+            if not alexa_entity_ids:
+                errors[CONF_ALEXA_ENTITY_IDS] = "no_devices"
+            elif (discovery := self.hass.data.get(DATA_DISCOVERY)) is not None and (
+                discovery.configured.intersection(alexa_entity_ids)
+            ):
+                # A media player is controlled by one entry only, including
+                # one already in a group
+                errors[CONF_ALEXA_ENTITY_IDS] = "already_configured"
 
-        # Get all media player entities that might be Alexa devices
-        states = self.hass.states.async_all("media_player")
-        alexa_entities = [
-            state.entity_id for state in states
-            if "alexa" in state.entity_id.lower() or 
-               (state.attributes.get("integration") == "alexa_media")
-        ]
+            if not errors:
+                names = ", ".join(
+                    entity_id.split(".")[-1] for entity_id in alexa_entity_ids
+                )
+                return self.async_create_entry(
+                    title=f"Time Control - {names}",
+                    data={CONF_ALEXA_ENTITY_IDS: alexa_entity_ids},
+                )
 
-        if not alexa_entities:
-            alexa_entities = [state.entity_id for state in states]
+        # Offer the discovered Alexa media players that are not configured yet
+        alexa_entities: list[str] = []
+        if (discovery := self.hass.data.get(DATA_DISCOVERY)) is not None:
+            alexa_entities = sorted(discovery.unconfigured)
+
+        # Several media players form a group sharing the same controls
+        entity_selector_config = selector.EntitySelectorConfig(
+            domain="media_player", multiple=True
+        )
+        if alexa_entities:
+            entity_selector_config["include_entities"] = alexa_entities
 
         data_schema = vol.Schema(
             {
-                vol.Required("alexa_entity_id"): selector.EntitySelector(
-                    selector.EntitySelectorConfig(
-                        domain="media_player",
-                    ),
+                vol.Required(CONF_ALEXA_ENTITY_IDS): selector.EntitySelector(
+                    entity_selector_config,
                 ),
             }
         )
@@ -108,3 +160,214 @@ class AlexaTimeControlConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             data_schema=data_schema,
             errors=errors,
         )
+
+
+class AlexaTimeControlOptionsFlow(config_entries.OptionsFlow):
+    """Handle options for Alexa Time Control."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize the options flow."""
+        self._config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        return self.async_show_menu(
+            step_id="init",
+            menu_options=["schedule", "enforcement", "messages"],
+        )
+
+    async def async_step_schedule(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the per-weekday schedules."""
+        errors: dict[str, str] = {}
+        placeholders = {"error": ""}
+        options = dict(self._config_entry.options)
+
+        if user_input is not None:
+            for key, value in user_input.items():
+                if key.startswith(CONF_SCHEDULE_PREFIX):
+                    try:
+                        parse_windows(value)
+                    except ValueError:
+                        errors[key] = "invalid_schedule"
+
+            if path := user_input.get(CONF_EXCEPTIONS_FILE):
+                path = self.hass.config.path(path)
+                if not await self.hass.async_add_executor_job(
+                    self.hass.config.is_allowed_path, path
+                ):
+                    errors[CONF_EXCEPTIONS_FILE] = "path_not_allowed"
+                else:
+                    try:
+                        await self.hass.async_add_executor_job(
+                            load_exception_calendar, path
+                        )
+                    except ValueError as err:
+                        errors[CONF_EXCEPTIONS_FILE] = "invalid_exceptions"
+                        placeholders["error"] = str(err)
+
+            if not errors:
+                return self.async_create_entry(title="", data={**options, **user_input})
+            options.update(user_input)
+
+        data_schema = vol.Schema(
+            {
+                vol.Optional(
+                    f"{CONF_SCHEDULE_PREFIX}{day}",
+                    default=options.get(f"{CONF_SCHEDULE_PREFIX}{day}", ""),
+                ): selector.TextSelector()
+                for day in WEEKDAYS
+            }
+        ).extend(
+            {
+                vol.Optional(
+                    CONF_DAILY_BUDGET,
+                    default=options.get(CONF_DAILY_BUDGET, 0),
+                ): vol.All(
+                    selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0, max=1440, mode=selector.NumberSelectorMode.BOX,
+                            unit_of_measurement="min",
+                        ),
+                    ),
+                    vol.Coerce(int),
+                ),
+                vol.Optional(
+                    CONF_EXCEPTIONS_FILE,
+                    default=options.get(CONF_EXCEPTIONS_FILE, ""),
+                ): selector.TextSelector(),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="schedule",
+            data_schema=data_schema,
+            errors=errors,
+            description_placeholders=placeholders,
+        )
+
+    async def async_step_enforcement(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage how playback is stopped."""
+        options = dict(self._config_entry.options)
+
+        if user_input is not None:
+            return self.async_create_entry(title="", data={**options, **user_input})
+
+        data_schema = vol.Schema(
+            {
+                vol.Optional(
+                    CONF_ENFORCEMENT_ORDER,
+                    default=options.get(CONF_ENFORCEMENT_ORDER, DEFAULT_ENFORCEMENT_ORDER),
+                ): selector.SelectSelector(
+                    selector.SelectSelectorConfig(
+                        options=ENFORCEMENT_ORDERS,
+                        translation_key=CONF_ENFORCEMENT_ORDER,
+                    ),
+                ),
+                vol.Optional(
+                    CONF_TTS_TIMEOUT,
+                    default=options.get(CONF_TTS_TIMEOUT, DEFAULT_TTS_TIMEOUT),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=1, max=60, step=0.5, unit_of_measurement="s",
+                    ),
+                ),
+                vol.Optional(
+                    CONF_STOP_TIMEOUT,
+                    default=options.get(CONF_STOP_TIMEOUT, DEFAULT_STOP_TIMEOUT),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=1, max=60, step=0.5, unit_of_measurement="s",
+                    ),
+                ),
+                vol.Optional(
+                    CONF_STOP_RETRIES,
+                    default=options.get(CONF_STOP_RETRIES, DEFAULT_STOP_RETRIES),
+                ): vol.All(
+                    selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0, max=5, mode=selector.NumberSelectorMode.BOX,
+                        ),
+                    ),
+                    vol.Coerce(int),
+                ),
+                vol.Optional(
+                    CONF_ANNOUNCE_COOLDOWN,
+                    default=options.get(CONF_ANNOUNCE_COOLDOWN, DEFAULT_ANNOUNCE_COOLDOWN),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=0, max=3600, mode=selector.NumberSelectorMode.BOX,
+                        unit_of_measurement="s",
+                    ),
+                ),
+                vol.Optional(
+                    CONF_ANNOUNCE_BURST,
+                    default=options.get(CONF_ANNOUNCE_BURST, DEFAULT_ANNOUNCE_BURST),
+                ): vol.All(
+                    selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=1, max=20, mode=selector.NumberSelectorMode.BOX,
+                        ),
+                    ),
+                    vol.Coerce(int),
+                ),
+                vol.Optional(
+                    CONF_ANNOUNCE_RATE,
+                    default=options.get(CONF_ANNOUNCE_RATE, DEFAULT_ANNOUNCE_RATE),
+                ): selector.NumberSelector(
+                    selector.NumberSelectorConfig(
+                        min=1, max=360, mode=selector.NumberSelectorMode.BOX,
+                        unit_of_measurement="/h",
+                    ),
+                ),
+            }
+        )
+
+        return self.async_show_form(
+            step_id="enforcement",
+            data_schema=data_schema,
+        )
+
+    async def async_step_messages(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the announcement templates."""
+        errors: dict[str, str] = {}
+        options = dict(self._config_entry.options)
+
+        if user_input is not None:
+            for key, value in user_input.items():
+                try:
+                    validate_template(value)
+                except ValueError:
+                    errors[key] = "invalid_template"
+
+            if not errors:
+                return self.async_create_entry(title="", data={**options, **user_input})
+            options.update(user_input)
+
+        data_schema = vol.Schema(
+            {
+                vol.Optional(
+                    f"{CONF_MESSAGE_PREFIX}{message_type}",
+                    default=options.get(f"{CONF_MESSAGE_PREFIX}{message_type}", ""),
+                ): selector.TextSelector(selector.TextSelectorConfig(multiline=True))
+                for message_type in (
+                    MESSAGE_BLOCKED, MESSAGE_TIME_RESTRICTED, MESSAGE_BUDGET_EXHAUSTED
+                )
+            }
+        )
+
+        return self.async_show_form(
+            step_id="messages",
+            data_schema=data_schema,
+            errors=errors,
+            description_placeholders={
+                "placeholders": ", ".join(f"`{{{name}}}`" for name in PLACEHOLDERS)
+            },
+        )
@@ -1,3 +1,47 @@
 """Constants for the Alexa Time Control integration."""
 
 DOMAIN = "alexa_time_control"
+
+# hass.data keys
+DATA_DISCOVERY = f"{DOMAIN}_discovery"
+DATA_DISPATCHER = f"{DOMAIN}_dispatcher"
+DATA_EXCEPTIONS = f"{DOMAIN}_exceptions"
+DATA_MESSAGES = f"{DOMAIN}_messages"
+DATA_PROFILER = f"{DOMAIN}_profiler"
+DATA_STORE = f"{DOMAIN}_store"
+
+# Config entry data
+CONF_ALEXA_ENTITY_IDS = "alexa_entity_ids"
+
+# Options
+CONF_SCHEDULE_PREFIX = "schedule_"
+CONF_DAILY_BUDGET = "daily_budget"
+CONF_EXCEPTIONS_FILE = "exceptions_file"
+CONF_ENFORCEMENT_ORDER = "enforcement_order"
+CONF_TTS_TIMEOUT = "tts_timeout"
+CONF_STOP_TIMEOUT = "stop_timeout"
+CONF_STOP_RETRIES = "stop_retries"
+CONF_ANNOUNCE_COOLDOWN = "announce_cooldown"
+CONF_ANNOUNCE_BURST = "announce_burst"
+CONF_ANNOUNCE_RATE = "announce_rate"
+CONF_MESSAGE_PREFIX = "message_"
+
+# Order of the announcement and the stop call
+ORDER_TTS_FIRST = "tts_first"
+ORDER_STOP_FIRST = "stop_first"
+ORDER_CONCURRENT = "concurrent"
+ENFORCEMENT_ORDERS = [ORDER_TTS_FIRST, ORDER_STOP_FIRST, ORDER_CONCURRENT]
+
+DEFAULT_ENFORCEMENT_ORDER = ORDER_TTS_FIRST
+DEFAULT_TTS_TIMEOUT = 10.0
+DEFAULT_STOP_TIMEOUT = 5.0
+DEFAULT_STOP_RETRIES = 2
+DEFAULT_ANNOUNCE_COOLDOWN = 30.0
+DEFAULT_ANNOUNCE_BURST = 3
+DEFAULT_ANNOUNCE_RATE = 20.0
+
+# Seconds to wait before checking whether a stopped player is playing again
+STOP_VERIFY_DELAY = 2.0
+
+# Dispatcher signals, formatted with the config entry ID
+SIGNAL_CONTROL_UPDATED = f"{DOMAIN}_control_updated_{{}}"
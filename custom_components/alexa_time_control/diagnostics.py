@@ -0,0 +1,48 @@
+"""Diagnostics support for Alexa Time Control."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .entity import async_get_entry_devices
+from .runtime import AlexaTimeControlData
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    devices = async_get_entry_devices(hass, entry)
+
+    # The control entities and values are shared by the devices of a group
+    return {
+        "entry": {
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "control_entities": {
+            key: entity.entity_id for key, entity in devices[0].entities.items()
+        },
+        "controls": devices[0].controls_as_dict(),
+        "devices": {
+            entry_data.alexa_entity_id: _device_diagnostics(entry_data)
+            for entry_data in devices
+        },
+    }
+
+
+def _device_diagnostics(entry_data: AlexaTimeControlData) -> dict[str, Any]:
+    """Return the diagnostics of a media player of an entry."""
+    schedule = entry_data.schedule
+    exceptions = entry_data.exceptions
+
+    return {
+        "schedule": schedule.intervals if schedule is not None else None,
+        "schedule_week": entry_data.schedule_week,
+        "exception_ranges": len(exceptions) if exceptions is not None else None,
+        "metrics": entry_data.metrics.as_dict(),
+        "last_enforcement": entry_data.last_enforcement,
+        "audit_records": len(entry_data.audit),
+    }
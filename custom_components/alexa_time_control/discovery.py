@@ -0,0 +1,104 @@
+"""Discovery of Alexa media players for Alexa Time Control."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+import logging
+from typing import Any
+
+from homeassistant.const import Platform
+from homeassistant.core import CoreState, Event, HomeAssistant, callback
+from homeassistant.helpers import discovery_flow, entity_registry as er
+
+from .const import DOMAIN
+from .runtime import entry_device_keys
+
+_LOGGER = logging.getLogger(__name__)
+
+# Integration platform owning the Alexa media players
+ALEXA_MEDIA_PLATFORM = "alexa_media"
+
+
+class AlexaDiscovery:
+    """Index of Alexa media players and the ones already configured.
+
+    The index is built once from the entity registry and then kept up to
+    date from entity registry events, so new devices are discovered as soon
+    as they are registered.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the discovery."""
+        self._hass = hass
+        self.candidates: set[str] = set()
+        self.configured: set[str] = {
+            entity_id
+            for entry in hass.config_entries.async_entries(DOMAIN)
+            for entity_id in entry_device_keys(entry)
+        }
+
+    @callback
+    def async_start(self) -> None:
+        """Build the index and start following entity registry updates."""
+        entity_reg = er.async_get(self._hass)
+        self.candidates = {
+            entity.entity_id
+            for entity in entity_reg.entities.values()
+            if entity.domain == Platform.MEDIA_PLAYER
+            and entity.platform == ALEXA_MEDIA_PLATFORM
+        }
+        self._hass.bus.async_listen(
+            er.EVENT_ENTITY_REGISTRY_UPDATED,
+            self._async_registry_updated,
+            event_filter=self._async_registry_filter,
+        )
+
+    @callback
+    def async_discover_all(self) -> None:
+        """Create discovery flows for all unconfigured candidates."""
+        for entity_id in self.candidates - self.configured:
+            self._async_create_flow(entity_id)
+
+    @property
+    def unconfigured(self) -> set[str]:
+        """Return the candidates that are not configured yet."""
+        return self.candidates - self.configured
+
+    @callback
+    def _async_registry_filter(self, event_data: Mapping[str, Any]) -> bool:
+        """Only pass registry updates of media players."""
+        return event_data["entity_id"].startswith(f"{Platform.MEDIA_PLAYER}.") or (
+            event_data.get("old_entity_id") in self.candidates
+        )
+
+    @callback
+    def _async_registry_updated(self, event: Event) -> None:
+        """Update the index from an entity registry update."""
+        entity_id = event.data["entity_id"]
+
+        if event.data["action"] == "remove":
+            self.candidates.discard(entity_id)
+            return
+
+        if (old_entity_id := event.data.get("old_entity_id")) is not None:
+            self.candidates.discard(old_entity_id)
+
+        entity = er.async_get(self._hass).async_get(entity_id)
+        if entity is None or entity.platform != ALEXA_MEDIA_PLATFORM:
+            return
+        if entity.entity_id in self.candidates:
+            return
+
+        self.candidates.add(entity.entity_id)
+        if entity.entity_id not in self.configured and self._hass.state is CoreState.running:
+            self._async_create_flow(entity.entity_id)
+
+    @callback
+    def _async_create_flow(self, entity_id: str) -> None:
+        """Create a discovery flow for a media player."""
+        _LOGGER.debug("Discovered Alexa media player %s", entity_id)
+        discovery_flow.async_create_flow(
+            self._hass,
+            DOMAIN,
+            context={"source": "discovery"},
+            data={"alexa_entity_id": entity_id},
+        )
@@ -0,0 +1,114 @@
+"""Shared state change dispatcher for Alexa Time Control."""
+from __future__ import annotations
+
+from collections.abc import Callable, Coroutine, Mapping
+from functools import partial
+import logging
+from typing import Any
+
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+
+from .recording import EventRecorder
+
+_LOGGER = logging.getLogger(__name__)
+
+PlaybackStartedAction = Callable[[HomeAssistant, str], Coroutine[Any, Any, None]]
+PlaybackStoppedAction = Callable[[HomeAssistant, str], None]
+HandlerWrapper = Callable[[Callable[..., Any]], Callable[..., Any]]
+
+
+class AlexaStateDispatcher:
+    """Route state changes of all tracked Alexa media players to their devices.
+
+    A single state_changed subscription is shared by every config entry; the
+    entity to device map is updated as entries are added or unloaded. Only
+    changes into or out of playing pass the event filter, so attribute
+    updates like the media position or volume are dropped synchronously.
+    Starts are handed to an async action in a task, stops to a callback.
+
+    While a recorder is set, every state change of a tracked entity is
+    handed to it before filtering. A wrapper, e.g. of the profiler, can be
+    put around the filter, the handler and the playback actions; the
+    subscription is renewed with the wrapped ones, so unwrapped dispatching
+    costs nothing extra.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        started: PlaybackStartedAction,
+        stopped: PlaybackStoppedAction,
+    ) -> None:
+        """Initialize the dispatcher."""
+        self._hass = hass
+        self._actions = (started, stopped)
+        self._started, self._stopped = self._actions
+        self.recorder: EventRecorder | None = None
+        self._devices: dict[str, str] = {}
+        self._wrapper: HandlerWrapper | None = None
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @callback
+    def async_add(self, entity_id: str, device_key: str) -> CALLBACK_TYPE:
+        """Start routing state changes of an entity to a device."""
+        self._devices[entity_id] = device_key
+        if self._unsub is None:
+            self._async_subscribe()
+        return partial(self._async_remove, entity_id)
+
+    @callback
+    def async_set_wrapper(self, wrapper: HandlerWrapper | None) -> None:
+        """Wrap the filter, the handler and the playback actions, None to unwrap."""
+        self._wrapper = wrapper
+        self._started, self._stopped = self._actions
+        if wrapper is not None:
+            self._started, self._stopped = map(wrapper, self._actions)
+        if self._unsub is not None:
+            self._unsub()
+            self._async_subscribe()
+
+    @callback
+    def _async_subscribe(self) -> None:
+        """Subscribe to state changes with the current filter and handler."""
+        listener: Callable[[Event], Any] = self._async_state_changed
+        event_filter: Callable[[Mapping[str, Any]], bool] = self._async_filter
+        if (wrapper := self._wrapper) is not None:
+            listener, event_filter = wrapper(listener), wrapper(event_filter)
+        self._unsub = self._hass.bus.async_listen(
+            EVENT_STATE_CHANGED, listener, event_filter=event_filter
+        )
+
+    @callback
+    def _async_remove(self, entity_id: str) -> None:
+        """Stop routing state changes of an entity."""
+        self._devices.pop(entity_id, None)
+        if not self._devices and self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _async_filter(self, event_data: Mapping[str, Any]) -> bool:
+        """Only pass playback starts and stops of tracked entities."""
+        if (device_key := self._devices.get(event_data["entity_id"])) is None:
+            return False
+        if self.recorder is not None:
+            self.recorder.async_record(device_key, event_data)
+        return _is_playing(event_data["new_state"]) != _is_playing(
+            event_data["old_state"]
+        )
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Hand a playback start or stop over to the device tracking the entity."""
+        if (device_key := self._devices.get(event.data["entity_id"])) is None:
+            return
+        if _is_playing(event.data["new_state"]):
+            self._hass.async_create_task(self._started(self._hass, device_key))
+        else:
+            self._stopped(self._hass, device_key)
+
+
+def _is_playing(state: State | None) -> bool:
+    """Return whether a media player state is playing."""
+    return state is not None and state.state == "playing"
@@ -0,0 +1,87 @@
+"""Base entity for the Alexa Time Control controls."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.entity import DeviceInfo, Entity
+
+from .const import DATA_STORE, DOMAIN, SIGNAL_CONTROL_UPDATED
+from .runtime import AlexaTimeControlData, entry_device_keys
+
+
+@callback
+def async_get_entry_devices(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> list[AlexaTimeControlData]:
+    """Return the runtime states of the media players of an entry."""
+    return [hass.data[DOMAIN][key] for key in entry_device_keys(entry).values()]
+
+
+class AlexaTimeControlEntity(Entity):
+    """A control value shared by the media players of a config entry.
+
+    The entity of a single media player is added to its Alexa device, the
+    entity of a group to a device of its own.
+    """
+
+    _attr_has_entity_name = True
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        devices: list[AlexaTimeControlData],
+        translation_key: str,
+    ) -> None:
+        """Initialize the entity."""
+        self._entry_id = entry.entry_id
+        self._devices = devices
+        self._attr_translation_key = translation_key
+        if len(devices) == 1:
+            self._attr_unique_id = f"{devices[0].alexa_entity_id}_{translation_key}"
+            # Resolved once per media player when the entry is set up and
+            # shared by all platforms; the entry is reloaded when it changes
+            self._attr_device_info = devices[0].device_info
+        else:
+            self._attr_unique_id = f"{entry.entry_id}_{translation_key}"
+            self._attr_device_info = DeviceInfo(
+                identifiers={(DOMAIN, entry.entry_id)},
+                name=entry.title,
+                entry_type=DeviceEntryType.SERVICE,
+            )
+
+    @property
+    def _value(self) -> Any:
+        """Return the control value of the media players."""
+        return getattr(self._devices[0], self._attr_translation_key)
+
+    async def async_added_to_hass(self) -> None:
+        """Register the entity with its media players."""
+        for data in self._devices:
+            data.entities[self._attr_translation_key] = self
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Unregister the entity from its media players."""
+        for data in self._devices:
+            data.entities.pop(self._attr_translation_key, None)
+
+    @callback
+    def _async_store(self, value: Any, stored: Any) -> None:
+        """Set the control value of all media players and store it."""
+        for data in self._devices:
+            setattr(data, self._attr_translation_key, value)
+        self.hass.data[DATA_STORE].async_set(
+            self._entry_id, self._attr_translation_key, stored
+        )
+
+    @callback
+    def _async_notify(self) -> None:
+        """Notify the integration of a changed value."""
+        async_dispatcher_send(
+            self.hass,
+            SIGNAL_CONTROL_UPDATED.format(self._entry_id),
+            self._attr_translation_key,
+        )
@@ -0,0 +1,295 @@
+"""Exception calendar for holidays, vacations and other special days."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator
+from datetime import date, timedelta
+import logging
+import os
+from typing import Any, NamedTuple, TextIO
+
+import voluptuous as vol
+import yaml
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers import config_validation as cv
+
+from .const import DATA_EXCEPTIONS
+from .schedule import Window, parse_windows
+
+_LOGGER = logging.getLogger(__name__)
+
+# The rules are read from parser events, which libyaml produces much faster
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+RULE_SCHEMA = vol.Schema(
+    {
+        vol.Optional("name", default=""): cv.string,
+        vol.Required("start"): cv.date,
+        vol.Optional("end"): cv.date,
+        vol.Optional("windows", default=""): cv.string,
+        vol.Optional("entity_id", default=[]): cv.entity_ids,
+    }
+)
+
+
+class ExceptionRule(NamedTuple):
+    """Allowed windows of a range of days, replacing the weekly schedule."""
+
+    name: str
+    start: date
+    end: date
+    # No windows blocks the whole day
+    windows: tuple[Window, ...]
+    # Media players the rule applies to, all if empty
+    entity_ids: frozenset[str]
+
+
+class ExceptionIndex:
+    """Exception rules of a device, flattened into sorted disjoint day ranges.
+
+    Where rules overlap, one for the device takes precedence over one for all
+    devices, then the one starting last, then the shorter one, so an exam
+    day inside a vacation wins. A lookup is a single binary search over the
+    day ordinals.
+    """
+
+    __slots__ = ("_starts", "_ends", "_rules")
+
+    def __init__(self, rules: Iterable[ExceptionRule]) -> None:
+        """Initialize the index from the rules of a device."""
+        days: dict[int, ExceptionRule] = {}
+        for rule in sorted(
+            rules,
+            key=lambda rule: (
+                bool(rule.entity_ids), rule.start, rule.start - rule.end
+            ),
+        ):
+            for day in range(rule.start.toordinal(), rule.end.toordinal() + 1):
+                days[day] = rule
+
+        starts: list[int] = []
+        ends: list[int] = []
+        rule_list: list[ExceptionRule] = []
+        for day in sorted(days):
+            rule = days[day]
+            if ends and ends[-1] == day - 1 and rule_list[-1] is rule:
+                ends[-1] = day
+            else:
+                starts.append(day)
+                ends.append(day)
+                rule_list.append(rule)
+        self._starts = starts
+        self._ends = ends
+        self._rules = rule_list
+
+    def __len__(self) -> int:
+        """Return the number of day ranges."""
+        return len(self._starts)
+
+    def rule_at(self, day: date) -> ExceptionRule | None:
+        """Return the rule in effect on a day, None if there is none."""
+        ordinal = day.toordinal()
+        index = bisect_right(self._starts, ordinal) - 1
+        if index >= 0 and ordinal <= self._ends[index]:
+            return self._rules[index]
+        return None
+
+
+class ExceptionCalendar:
+    """Exception rules loaded from a file, indexed per device on demand."""
+
+    def __init__(self, path: str, rules: list[ExceptionRule]) -> None:
+        """Initialize the calendar."""
+        self.path = path
+        self.rules = rules
+        self._indexes: dict[str, ExceptionIndex] = {}
+
+    def index_for(self, entity_id: str) -> ExceptionIndex:
+        """Return the index of the rules applying to a media player."""
+        if (index := self._indexes.get(entity_id)) is None:
+            index = self._indexes[entity_id] = ExceptionIndex(
+                rule
+                for rule in self.rules
+                if not rule.entity_ids or entity_id in rule.entity_ids
+            )
+        return index
+
+
+async def async_get_exception_calendar(
+    hass: HomeAssistant, path: str
+) -> ExceptionCalendar:
+    """Return the exception calendar of a file.
+
+    Files are read once and shared by all devices using them until the
+    calendars are reloaded. Raises ValueError if the file cannot be read.
+    """
+    cache: dict[str, ExceptionCalendar] = hass.data.setdefault(DATA_EXCEPTIONS, {})
+    if (calendar := cache.get(path)) is not None:
+        return calendar
+
+    calendar = cache[path] = await hass.async_add_executor_job(
+        load_exception_calendar, path
+    )
+    return calendar
+
+
+def load_exception_calendar(path: str) -> ExceptionCalendar:
+    """Read an exception calendar from an ICS or YAML file.
+
+    The file is parsed as a stream, one rule at a time. Raises ValueError
+    if it cannot be read or holds an invalid rule.
+    """
+    parse = _iter_ics_rules if path.lower().endswith(".ics") else _iter_yaml_rules
+    try:
+        with open(path, encoding="utf-8") as file:
+            rules = list(parse(file))
+    except OSError as err:
+        raise ValueError(f"Cannot read {path}: {err}") from err
+    except yaml.YAMLError as err:
+        raise ValueError(f"Invalid YAML in {path}: {err}") from err
+
+    _LOGGER.debug("Loaded %d exception rules from %s", len(rules), path)
+    return ExceptionCalendar(path, rules)
+
+
+def _iter_yaml_rules(file: TextIO) -> Iterator[ExceptionRule]:
+    """Yield the rules of a YAML list, building one item at a time."""
+    loader = SafeLoader(file)
+    try:
+        loader.get_event()  # Stream start
+        if loader.check_event(yaml.StreamEndEvent):
+            return
+        loader.get_event()  # Document start
+        if not loader.check_event(yaml.SequenceStartEvent):
+            raise ValueError(f"{os.path.basename(file.name)} must hold a list of rules")
+        loader.get_event()
+
+        number = 0
+        while not loader.check_event(yaml.SequenceEndEvent):
+            number += 1
+            yield _rule(_build(loader), f"rule {number}")
+    finally:
+        loader.dispose()
+
+
+def _build(loader: Any) -> Any:
+    """Build the next value from the parser events.
+
+    Scalars are kept as strings, the rule schema converts them.
+    """
+    event = loader.get_event()
+    if isinstance(event, yaml.ScalarEvent):
+        return event.value
+    if isinstance(event, yaml.SequenceStartEvent):
+        items = []
+        while not loader.check_event(yaml.SequenceEndEvent):
+            items.append(_build(loader))
+        loader.get_event()
+        return items
+    if isinstance(event, yaml.MappingStartEvent):
+        mapping = {}
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = _build(loader)
+            mapping[key] = _build(loader)
+        loader.get_event()
+        return mapping
+    raise ValueError(f"Unsupported YAML on line {event.start_mark.line + 1}")
+
+
+def _rule(item: Any, where: str) -> ExceptionRule:
+    """Validate a rule read from YAML."""
+    try:
+        item = RULE_SCHEMA(item)
+        windows = parse_windows(item["windows"])
+    except (vol.Invalid, ValueError) as err:
+        raise ValueError(f"Invalid {where}: {err}") from err
+
+    end = item.get("end", item["start"])
+    if end < item["start"]:
+        raise ValueError(f"Invalid {where}: end lies before start")
+    return ExceptionRule(
+        item["name"], item["start"], end, tuple(windows), frozenset(item["entity_id"])
+    )
+
+
+def _iter_ics_rules(file: TextIO) -> Iterator[ExceptionRule]:
+    """Yield a rule per VEVENT of an iCalendar file.
+
+    The event's days are taken from DTSTART and DTEND, its windows from
+    DESCRIPTION (no description blocks the days) and the media players it
+    applies to from CATEGORIES. Recurring events are skipped.
+    """
+    event: dict[str, str] | None = None
+    for line in _unfold(file):
+        name, _, value = line.partition(":")
+        key = name.partition(";")[0].upper()
+        if key == "BEGIN" and value.upper() == "VEVENT":
+            event = {}
+        elif key == "END" and value.upper() == "VEVENT" and event is not None:
+            if "RRULE" in event:
+                _LOGGER.warning(
+                    "Skipping recurring event %s in %s",
+                    event.get("SUMMARY", ""), file.name,
+                )
+            else:
+                yield _ics_rule(event)
+            event = None
+        elif event is not None:
+            event[key] = value
+
+
+def _unfold(lines: Iterable[str]) -> Iterator[str]:
+    """Join the folded content lines of an iCalendar stream."""
+    current = ""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t"):
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def _ics_rule(event: dict[str, str]) -> ExceptionRule:
+    """Convert the properties of a VEVENT into a rule."""
+    summary = _unescape(event.get("SUMMARY", ""))
+    try:
+        start = _ics_date(event["DTSTART"])
+        end = start
+        if dtend := event.get("DTEND"):
+            # The end is exclusive, unless the event ends during a day
+            end = _ics_date(dtend)
+            if not int(dtend[9:15] or 0) and end > start:
+                end -= timedelta(days=1)
+        windows = parse_windows(_unescape(event.get("DESCRIPTION", "")))
+    except (KeyError, ValueError) as err:
+        raise ValueError(f"Invalid event {summary}: {err}") from err
+
+    entity_ids = {
+        category.strip()
+        for category in _unescape(event.get("CATEGORIES", "")).split(",")
+        if category.strip().startswith("media_player.")
+    }
+    return ExceptionRule(
+        summary, start, max(start, end), tuple(windows), frozenset(entity_ids)
+    )
+
+
+def _ics_date(value: str) -> date:
+    """Return the date of an iCalendar DATE or DATE-TIME value."""
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def _unescape(value: str) -> str:
+    """Unescape an iCalendar text value."""
+    return (
+        value.replace("\\n", "\n")
+        .replace("\\N", "\n")
+        .replace("\\,", ",")
+        .replace("\\;", ";")
+        .replace("\\\\", "\\")
+    )
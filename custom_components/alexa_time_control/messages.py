@@ -0,0 +1,60 @@
+"""Localized announcement messages for Alexa Time Control."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.translation import async_get_translations
+
+from .const import DATA_MESSAGES, DOMAIN
+
+MESSAGE_BLOCKED = "blocked"
+MESSAGE_BUDGET_EXHAUSTED = "budget_exhausted"
+MESSAGE_TIME_RESTRICTED = "time_restricted"
+MESSAGES = (MESSAGE_BLOCKED, MESSAGE_BUDGET_EXHAUSTED, MESSAGE_TIME_RESTRICTED)
+
+# Translation category holding the message templates
+TRANSLATION_CATEGORY = "tts"
+
+# Placeholders every template may use
+PLACEHOLDERS = ("name", "current_time", "end_time", "start_time")
+
+
+async def async_get_message_templates(
+    hass: HomeAssistant, language: str
+) -> Mapping[str, str]:
+    """Return the message templates of a language, keyed by message type.
+
+    Templates are read from the integration's translation files once per
+    language, missing ones fall back to English.
+    """
+    cache: dict[str, Mapping[str, str]] = hass.data.setdefault(DATA_MESSAGES, {})
+    if (templates := cache.get(language)) is not None:
+        return templates
+
+    translations = await async_get_translations(
+        hass, language, TRANSLATION_CATEGORY, [DOMAIN]
+    )
+    prefix = f"component.{DOMAIN}.{TRANSLATION_CATEGORY}."
+    templates = cache[language] = {
+        message_type: translations.get(f"{prefix}{message_type}", "")
+        for message_type in MESSAGES
+    }
+    return templates
+
+
+def render_message(template: str, **placeholders: str) -> str:
+    """Render a message template.
+
+    Separators left dangling by empty placeholders, e.g. an unset name, are
+    stripped.
+    """
+    return template.format_map(placeholders).strip(" ,")
+
+
+def validate_template(template: str) -> None:
+    """Raise ValueError if a template cannot be rendered."""
+    try:
+        render_message(template, **dict.fromkeys(PLACEHOLDERS, ""))
+    except (AttributeError, IndexError, KeyError) as err:
+        raise ValueError(f"Invalid template: {template}") from err
@@ -0,0 +1,108 @@
+"""Enforcement metrics for Alexa Time Control."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Mapping
+from typing import Any
+
+DECISION_ALLOWED = "allowed"
+DECISION_BLOCKED = "blocked"
+DECISION_TIME_RESTRICTED = "time_restricted"
+DECISION_DISABLED = "disabled"
+DECISION_BUDGET_EXHAUSTED = "budget_exhausted"
+DECISIONS = (
+    DECISION_ALLOWED,
+    DECISION_BLOCKED,
+    DECISION_TIME_RESTRICTED,
+    DECISION_DISABLED,
+    DECISION_BUDGET_EXHAUSTED,
+)
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+# Steps of the announce-and-stop pipeline that are tracked
+SERVICE_STEPS = ("tts", "stop", "silence")
+
+
+class LatencyHistogram:
+    """Histogram of latencies with fixed buckets."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        """Record a latency in seconds."""
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean latency in seconds."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as a dictionary."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "buckets": {
+                str(bound): count for bound, count in zip(LATENCY_BUCKETS, self.counts)
+            },
+        }
+
+
+class EnforcementMetrics:
+    """Decision counters and latency histograms of a device."""
+
+    __slots__ = ("decisions", "decision_latency", "service_latency", "last_silence")
+
+    def __init__(self) -> None:
+        """Initialize the metrics."""
+        self.decisions = dict.fromkeys(DECISIONS, 0)
+        self.decision_latency = LatencyHistogram()
+        self.service_latency = {step: LatencyHistogram() for step in SERVICE_STEPS}
+        self.last_silence: float | None = None
+
+    @property
+    def stops(self) -> int:
+        """Return how often playback was stopped."""
+        return (
+            self.decisions[DECISION_BLOCKED]
+            + self.decisions[DECISION_TIME_RESTRICTED]
+            + self.decisions[DECISION_BUDGET_EXHAUSTED]
+        )
+
+    def record_decision(self, decision: str, duration: float) -> None:
+        """Record a decision and how long it took."""
+        self.decisions[decision] += 1
+        self.decision_latency.observe(duration)
+
+    def record_enforcement(self, latencies: Mapping[str, float]) -> None:
+        """Record the step latencies of an announce-and-stop run."""
+        for step, histogram in self.service_latency.items():
+            if (value := latencies.get(step)) is not None:
+                histogram.observe(value)
+        self.last_silence = latencies.get("silence")
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a dictionary."""
+        return {
+            "decisions": dict(self.decisions),
+            "decision_latency": self.decision_latency.as_dict(),
+            "service_latency": {
+                step: histogram.as_dict()
+                for step, histogram in self.service_latency.items()
+            },
+            "last_silence": self.last_silence,
+        }
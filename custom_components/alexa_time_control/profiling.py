@@ -0,0 +1,236 @@
+"""Opt-in profiling of the Alexa Time Control enforcement path."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine, Generator
+import cProfile
+from datetime import datetime, timedelta
+from functools import partial, wraps
+import importlib
+import io
+import logging
+import os
+import pstats
+import re
+import tracemalloc
+from types import ModuleType
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import dt as dt_util
+
+from .const import DATA_DISPATCHER, DATA_PROFILER, DOMAIN
+from .dispatcher import AlexaStateDispatcher
+
+_LOGGER = logging.getLogger(__name__)
+
+# Functions of the enforcement path looked up as globals of the package
+PROFILED_FUNCTIONS = (
+    "async_get_message_templates",
+    "_render_message",
+    "_send_tts_and_stop",
+)
+
+# Number of frames kept per allocation and entries written per section
+TRACEMALLOC_FRAMES = 10
+REPORT_ENTRIES = 30
+
+
+class EnforcementProfiler:
+    """Profile the enforcement path for a limited time.
+
+    The state change handlers and playback actions of the dispatcher and
+    the functions in PROFILED_FUNCTIONS are swapped for wrappers running
+    them under cProfile and put back when profiling stops, so nothing is
+    checked on the path while profiling is off. Coroutines are only profiled while they run,
+    not while they wait. tracemalloc traces all allocations meanwhile.
+    The report is written to a text file, the raw statistics next to it for
+    tools like snakeviz.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the profiler."""
+        self._hass = hass
+        self.path = path
+        self.calls = 0
+        self._profile = cProfile.Profile()
+        self._depth = 0
+        self._started_tracing = False
+        self._snapshot: tracemalloc.Snapshot | None = None
+        self._originals: list[tuple[ModuleType, str, Any]] = []
+        self._unsub_timer: CALLBACK_TYPE | None = None
+        self._unsub_stop: CALLBACK_TYPE | None = None
+        self._done: asyncio.Future[None] | None = None
+
+    async def async_start(self, duration: timedelta) -> None:
+        """Swap in the wrappers and stop profiling after duration."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            self._started_tracing = True
+        self._snapshot = await self._hass.async_add_executor_job(_take_snapshot)
+
+        package = importlib.import_module(__package__)
+        for name in PROFILED_FUNCTIONS:
+            original = getattr(package, name)
+            self._originals.append((package, name, original))
+            setattr(package, name, self._wrap(original))
+        dispatcher: AlexaStateDispatcher = self._hass.data[DATA_DISPATCHER]
+        dispatcher.async_set_wrapper(self._wrap)
+
+        self._unsub_timer = async_call_later(
+            self._hass, duration, self._async_timer_expired
+        )
+        self._unsub_stop = self._hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_hass_stopping
+        )
+
+    async def async_stop(self) -> None:
+        """Put back the original functions and write the report."""
+        if self._done is not None:
+            await self._done
+            return
+        self._done = self._hass.loop.create_future()
+
+        if self._unsub_timer is not None:
+            self._unsub_timer()
+            self._unsub_timer = None
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        for module, name, original in self._originals:
+            setattr(module, name, original)
+        self._originals.clear()
+        self._hass.data[DATA_DISPATCHER].async_set_wrapper(None)
+
+        try:
+            await self._hass.async_add_executor_job(self._write_report)
+        finally:
+            if self._started_tracing:
+                tracemalloc.stop()
+            self._done.set_result(None)
+
+    def _wrap(self, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Return a wrapper running a function or coroutine under the profiler."""
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def _async_profiled(*args: Any, **kwargs: Any) -> Any:
+                self.calls += 1
+                return await _ProfiledCoroutine(self, func(*args, **kwargs))
+
+            return _async_profiled
+
+        # wraps copies the callback marker, the bus requires it
+        @wraps(func)
+        def _profiled(*args: Any, **kwargs: Any) -> Any:
+            self.calls += 1
+            self._enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._disable()
+
+        return _profiled
+
+    def _enable(self) -> None:
+        """Enable the profiler, unless a profiled call is already running."""
+        if not self._depth:
+            self._profile.enable()
+        self._depth += 1
+
+    def _disable(self) -> None:
+        """Disable the profiler when the outermost profiled call returns."""
+        self._depth -= 1
+        if not self._depth:
+            self._profile.disable()
+
+    def _write_report(self) -> None:
+        """Write the profile and the allocations made while profiling."""
+        # Taken first, so the report itself does not show up in it
+        snapshot = _take_snapshot()
+        self._profile.dump_stats(f"{self.path}.prof")
+
+        stream = io.StringIO()
+        stream.write(f"Profiled calls: {self.calls}\n\n")
+        if self.calls:
+            stats = pstats.Stats(self._profile, stream=stream)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(REPORT_ENTRIES)
+            # Cheap steps of the decision path would not make the top entries
+            stream.write("Functions of the integration:\n")
+            stats.print_stats(re.escape(os.path.dirname(__file__)))
+
+        stream.write("Memory allocated while profiling, by line:\n")
+        if self._snapshot is not None:
+            diffs = snapshot.compare_to(self._snapshot, "lineno")
+            for diff in diffs[:REPORT_ENTRIES]:
+                stream.write(f"{diff}\n")
+
+        with open(self.path, "w", encoding="utf-8") as file:
+            file.write(stream.getvalue())
+
+    async def _async_timer_expired(self, now: datetime) -> None:
+        """Stop profiling once its time is up."""
+        self._unsub_timer = None
+        await async_stop_profiler(self._hass, self)
+
+    async def _async_hass_stopping(self, event: Event) -> None:
+        """Write the report when Home Assistant stops."""
+        self._unsub_stop = None
+        await async_stop_profiler(self._hass, self)
+
+
+class _ProfiledCoroutine:
+    """Drive a coroutine, profiling each step it runs but not its waits."""
+
+    __slots__ = ("_profiler", "_coro")
+
+    def __init__(
+        self, profiler: EnforcementProfiler, coro: Coroutine[Any, Any, Any]
+    ) -> None:
+        """Initialize the wrapper."""
+        self._profiler = profiler
+        self._coro = coro
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        """Run the coroutine, one profiled step at a time."""
+        send = partial(self._coro.send, None)
+        while True:
+            self._profiler._enable()
+            try:
+                future = send()
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self._profiler._disable()
+            try:
+                send = partial(self._coro.send, (yield future))
+            except BaseException as err:
+                send = partial(self._coro.throw, err)
+
+
+async def async_stop_profiler(
+    hass: HomeAssistant, profiler: EnforcementProfiler
+) -> None:
+    """Stop a profiler and forget it, if it is still the active one."""
+    if hass.data.get(DATA_PROFILER) is profiler:
+        hass.data.pop(DATA_PROFILER)
+    await profiler.async_stop()
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    """Take a snapshot of the traced allocations, except the profilers' own."""
+    return tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, module.__file__)
+            for module in (cProfile, pstats, tracemalloc)
+        ]
+    )
+
+
+def profile_path(hass: HomeAssistant) -> str:
+    """Return the path of a new report in the config directory."""
+    return hass.config.path(
+        f"{DOMAIN}_profile_{dt_util.now().strftime('%Y%m%d-%H%M%S')}.txt"
+    )
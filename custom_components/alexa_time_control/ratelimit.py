@@ -0,0 +1,52 @@
+"""Announcement rate limiting for Alexa Time Control."""
+from __future__ import annotations
+
+
+class TokenBucket:
+    """Token bucket allowing bursts of capacity and a sustained rate."""
+
+    __slots__ = ("capacity", "rate", "_tokens", "_updated")
+
+    def __init__(self, capacity: float, rate: float) -> None:
+        """Initialize the bucket, rate being tokens per second."""
+        self.capacity = capacity
+        self.rate = rate
+        self._tokens = capacity
+        self._updated: float | None = None
+
+    def try_acquire(self, now: float) -> bool:
+        """Take a token if one is available at monotonic time now."""
+        if self._updated is not None:
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+        self._updated = now
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class AnnouncementThrottle:
+    """Coalesce and rate limit the TTS announcements of a device.
+
+    Announcements within cooldown seconds of the previous one are coalesced
+    into it, the remaining ones have to take a token from the bucket.
+    """
+
+    __slots__ = ("cooldown", "_bucket", "_last")
+
+    def __init__(self, cooldown: float, capacity: int, per_hour: float) -> None:
+        """Initialize the throttle."""
+        self.cooldown = cooldown
+        self._bucket = TokenBucket(capacity, per_hour / 3600)
+        self._last: float | None = None
+
+    def allow(self, now: float) -> bool:
+        """Return whether an announcement may be sent at monotonic time now."""
+        if self._last is not None and now - self._last < self.cooldown:
+            return False
+        if not self._bucket.try_acquire(now):
+            return False
+        self._last = now
+        return True
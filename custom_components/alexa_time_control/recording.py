@@ -0,0 +1,142 @@
+"""Recording of the state changes seen by Alexa Time Control."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Mapping
+from datetime import timedelta
+from functools import partial
+import logging
+from typing import Any, TextIO
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.json import json_dumps
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+# Interval and number of buffered lines after which they are written
+FLUSH_INTERVAL = timedelta(seconds=10)
+FLUSH_LINES = 100
+
+
+class EventRecorder:
+    """Append the state changes of the tracked Alexa media players to a JSONL file.
+
+    The file starts with a line per device holding its media player, the
+    options of its config entry and the time zone of the instance. Every
+    state change is written with its local time and the control values in
+    effect, so benchmarks/replay.py can run it through the decision logic.
+    Lines are buffered and written from the executor.
+    """
+
+    def __init__(self, hass: HomeAssistant, path: str) -> None:
+        """Initialize the recorder."""
+        self._hass = hass
+        self.path = path
+        self.events = 0
+        self._file: TextIO | None = None
+        self._lines: list[str] = []
+        self._lock = asyncio.Lock()
+        self._unsub_flush: CALLBACK_TYPE | None = None
+        self._unsub_stop: CALLBACK_TYPE | None = None
+
+    async def async_start(self) -> None:
+        """Open the file and record the devices."""
+        self._file = await self._hass.async_add_executor_job(
+            partial(open, self.path, "a", encoding="utf-8")
+        )
+        for device_key, entry_data in self._hass.data[DOMAIN].items():
+            if (
+                entry := self._hass.config_entries.async_get_entry(entry_data.entry_id)
+            ) is None:
+                continue
+            self._lines.append(
+                json_dumps(
+                    {
+                        "type": "entry",
+                        "device": device_key,
+                        "entity_id": entry_data.alexa_entity_id,
+                        "options": dict(entry.options),
+                        "time_zone": self._hass.config.time_zone,
+                    }
+                )
+            )
+        self._unsub_flush = async_track_time_interval(
+            self._hass, self._async_flush, FLUSH_INTERVAL
+        )
+        self._unsub_stop = self._hass.bus.async_listen_once(
+            EVENT_HOMEASSISTANT_STOP, self._async_hass_stopping
+        )
+
+    @callback
+    def async_record(self, device_key: str, event_data: Mapping[str, Any]) -> None:
+        """Record a state change of the media player of a device.
+
+        The bus filters events as they are fired, so the current time is
+        the time of the change.
+        """
+        if (entry_data := self._hass.data[DOMAIN].get(device_key)) is None:
+            return
+        self._lines.append(
+            json_dumps(
+                {
+                    "type": "event",
+                    "time": dt_util.now().isoformat(),
+                    "device": device_key,
+                    "old_state": _state(event_data["old_state"]),
+                    "new_state": _state(event_data["new_state"]),
+                    "controls": entry_data.controls_as_dict(),
+                }
+            )
+        )
+        self.events += 1
+        if len(self._lines) >= FLUSH_LINES:
+            self._async_flush()
+
+    async def async_stop(self) -> None:
+        """Write the remaining lines and close the file."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        if self._unsub_stop is not None:
+            self._unsub_stop()
+            self._unsub_stop = None
+        await self._async_write()
+        async with self._lock:
+            if self._file is not None:
+                await self._hass.async_add_executor_job(self._file.close)
+                self._file = None
+
+    @callback
+    def _async_flush(self, *_: Any) -> None:
+        """Write the buffered lines in the background."""
+        if self._lines:
+            self._hass.async_create_background_task(
+                self._async_write(), "alexa_time_control recording flush"
+            )
+
+    async def _async_write(self) -> None:
+        """Write the buffered lines, one write at a time to keep their order."""
+        async with self._lock:
+            if not self._lines or self._file is None:
+                return
+            lines, self._lines = self._lines, []
+            await self._hass.async_add_executor_job(
+                self._file.writelines, [f"{line}\n" for line in lines]
+            )
+            await self._hass.async_add_executor_job(self._file.flush)
+
+    async def _async_hass_stopping(self, event: Event) -> None:
+        """Close the file when Home Assistant stops."""
+        self._unsub_stop = None
+        await self.async_stop()
+
+
+def _state(state: State | None) -> str | None:
+    """Return the state string of a state."""
+    return state.state if state is not None else None
+
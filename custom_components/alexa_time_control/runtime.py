@@ -0,0 +1,153 @@
+"""Runtime state of the devices controlled by Alexa Time Control."""
+from __future__ import annotations
+
+from datetime import date, time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.util import dt as dt_util
+
+from .audit import AuditLog
+from .const import CONF_ALEXA_ENTITY_IDS
+from .metrics import EnforcementMetrics
+from .ratelimit import AnnouncementThrottle
+from .schedule import ScheduleState, WeeklySchedule
+from .usage import PlaybackUsage, day_position
+
+if TYPE_CHECKING:
+    from .exception_calendar import ExceptionIndex
+    from .store import AlexaTimeControlStore
+
+DEFAULT_START_TIME = time(8, 0)
+DEFAULT_END_TIME = time(20, 0)
+
+
+def entry_device_keys(entry: ConfigEntry) -> dict[str, str]:
+    """Return the keys of the runtime states of an entry, by media player.
+
+    The key of an entry's only media player is the entry ID, so the values
+    stored for entries created before groups existed stay valid. Entries are
+    only migrated when they are set up, so an entry of version 1 may still
+    hold its single media player.
+    """
+    if entry.version < 2:
+        entity_ids = [entry.data["alexa_entity_id"]]
+    else:
+        entity_ids = entry.data[CONF_ALEXA_ENTITY_IDS]
+    if len(entity_ids) == 1:
+        return {entity_ids[0]: entry.entry_id}
+    return {entity_id: f"{entry.entry_id}_{entity_id}" for entity_id in entity_ids}
+
+
+class AlexaTimeControlData:
+    """Runtime state of a media player controlled by a config entry.
+
+    The control values are kept here in parsed form and updated by the
+    control entities as they change, so decisions are made from these
+    fields without any state machine lookups. The media players of a
+    group entry share the control entities, which update all of them.
+    """
+
+    __slots__ = (
+        "entry_id",
+        "alexa_entity_id",
+        "enabled",
+        "blocked",
+        "start_time",
+        "end_time",
+        "name",
+        "device_id",
+        "device_info",
+        "entities",
+        "exceptions",
+        "schedule",
+        "schedule_week",
+        "schedule_state",
+        "boundary_timer",
+        "usage",
+        "budget_timer",
+        "listening",
+        "throttle",
+        "last_enforcement",
+        "metrics",
+        "audit",
+        "listeners",
+    )
+
+    def __init__(
+        self,
+        entry_id: str,
+        alexa_entity_id: str,
+        enabled: bool = False,
+        blocked: bool = False,
+        start_time: time = DEFAULT_START_TIME,
+        end_time: time = DEFAULT_END_TIME,
+        name: str = "",
+    ) -> None:
+        """Initialize the runtime state."""
+        self.entry_id = entry_id
+        self.alexa_entity_id = alexa_entity_id
+        self.enabled = enabled
+        self.blocked = blocked
+        self.start_time = start_time
+        self.end_time = end_time
+        self.name = name
+        self.device_id: str | None = None
+        self.device_info: DeviceInfo | None = None
+        self.entities: dict[str, Any] = {}
+        self.exceptions: ExceptionIndex | None = None
+        self.schedule: WeeklySchedule | None = None
+        self.schedule_week: date | None = None
+        self.schedule_state: ScheduleState | None = None
+        self.boundary_timer: CALLBACK_TYPE | None = None
+        self.usage = PlaybackUsage(day_position(dt_util.now())[0])
+        self.budget_timer: CALLBACK_TYPE | None = None
+        self.listening = False
+        self.throttle: AnnouncementThrottle | None = None
+        self.last_enforcement: dict[str, float] | None = None
+        self.metrics = EnforcementMetrics()
+        self.audit = AuditLog()
+        self.listeners: list[CALLBACK_TYPE] = []
+
+    def controls_as_dict(self) -> dict[str, Any]:
+        """Return the control values as a dictionary."""
+        return {
+            "enabled": self.enabled,
+            "blocked": self.blocked,
+            "start_time": self.start_time.isoformat(),
+            "end_time": self.end_time.isoformat(),
+            "name": self.name,
+        }
+
+    @classmethod
+    def restore(
+        cls,
+        entry_id: str,
+        device_key: str,
+        alexa_entity_id: str,
+        store: AlexaTimeControlStore,
+    ) -> AlexaTimeControlData:
+        """Create the runtime state of a device from its stored values.
+
+        The control values are stored per entry, the usage per device.
+        """
+        start_time = store.async_get(entry_id, "start_time")
+        end_time = store.async_get(entry_id, "end_time")
+        data = cls(
+            entry_id,
+            alexa_entity_id,
+            store.async_get(entry_id, "enabled", False),
+            store.async_get(entry_id, "blocked", False),
+            time.fromisoformat(start_time) if start_time else DEFAULT_START_TIME,
+            time.fromisoformat(end_time) if end_time else DEFAULT_END_TIME,
+            store.async_get(entry_id, "name", ""),
+        )
+
+        # Restore today's playback time
+        usage = store.async_get(device_key, "usage")
+        if usage and usage["day"] == data.usage.day:
+            data.usage.used = usage["used"]
+
+        return data
@@ -0,0 +1,276 @@
+"""Compiled weekly schedules for Alexa Time Control."""
+from __future__ import annotations
+
+from bisect import bisect_right
+from collections.abc import Iterable, Iterator, Mapping
+from datetime import datetime, time, timedelta, timezone
+from typing import NamedTuple
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+Window = tuple[int, int]
+
+
+def minute_of_day(value: time) -> int:
+    """Return the minute of the day of a time."""
+    return value.hour * 60 + value.minute
+
+
+def minute_of_week(value: datetime) -> int:
+    """Return the minute of the week of a datetime, Monday 00:00 being 0."""
+    return value.weekday() * MINUTES_PER_DAY + value.hour * 60 + value.minute
+
+
+def schedule_time(now: datetime) -> datetime:
+    """Return the wall-clock minute a schedule is evaluated at for a local time.
+
+    While the clock is turned back, the repeated wall-clock times are not
+    evaluated again: the last minute before the clock was turned back is
+    used until the wall clock has caught up, so no window is entered or left
+    twice.
+    """
+    now = now.replace(second=0, microsecond=0)
+    if not now.fold or not (overlap := now.replace(fold=0).utcoffset() - now.utcoffset()):
+        return now
+
+    # Find the first minute after the clock was turned back
+    low = now.astimezone(timezone.utc) - overlap
+    high = now.astimezone(timezone.utc)
+    while high - low > timedelta(minutes=1):
+        middle = low + (high - low) / 2
+        if middle.astimezone(now.tzinfo).fold:
+            high = middle
+        else:
+            low = middle
+    turned_back = high.astimezone(now.tzinfo).replace(second=0, microsecond=0, fold=0)
+    return turned_back + overlap - timedelta(minutes=1)
+
+
+def wall_time_after(start: datetime, minutes: int) -> datetime:
+    """Return the first moment the wall clock shows start plus some minutes.
+
+    A wall-clock time skipped by a DST change resolves to the moment the
+    clock jumps past it.
+    """
+    wall = start + timedelta(minutes=minutes)
+    moment = wall.astimezone(timezone.utc).astimezone(start.tzinfo)
+    if moment.replace(tzinfo=None, fold=0) == wall.replace(tzinfo=None, fold=0):
+        return moment
+
+    # The wall time was skipped, find the moment the clock jumped past it
+    low = wall.replace(fold=1).astimezone(timezone.utc)
+    high = wall.replace(fold=0).astimezone(timezone.utc)
+    offset = low.astimezone(start.tzinfo).utcoffset()
+    while high - low > timedelta(minutes=1):
+        middle = low + (high - low) / 2
+        if middle.astimezone(start.tzinfo).utcoffset() == offset:
+            low = middle
+        else:
+            high = middle
+    return high.astimezone(start.tzinfo).replace(second=0, microsecond=0)
+
+
+def format_minute(minute: int) -> str:
+    """Format a minute of the day or week as HH:MM."""
+    minute %= MINUTES_PER_DAY
+    return f"{minute // 60:02d}:{minute % 60:02d}"
+
+
+def parse_time(value: str) -> int:
+    """Parse a HH:MM[:SS] string into a minute of the day."""
+    parts = value.strip().split(":")
+    hour = int(parts[0])
+    minute = int(parts[1]) if len(parts) > 1 else 0
+    if not 0 <= hour <= 24 or not 0 <= minute < 60 or hour * 60 + minute > MINUTES_PER_DAY:
+        raise ValueError(f"Invalid time: {value}")
+    return hour * 60 + minute
+
+
+def parse_windows(value: str) -> list[Window]:
+    """Parse a window list like "08:00-12:00, 13:00-20:00".
+
+    A window whose end lies before its start crosses midnight.
+    """
+    windows = []
+    for part in value.split(","):
+        if not (part := part.strip()):
+            continue
+        start, sep, end = part.partition("-")
+        if not sep:
+            raise ValueError(f"Invalid window: {part}")
+        windows.append((parse_time(start), parse_time(end)))
+    return windows
+
+
+class ScheduleState(NamedTuple):
+    """State of a schedule at a point in time, valid until it expires."""
+
+    allowed: bool
+    window: Window | None
+    previous_end: int | None
+    next_start: int | None
+    expires: datetime
+
+
+class WeeklySchedule:
+    """Allowed windows of a week, compiled into a sorted interval table.
+
+    Intervals are half-open minute-of-week ranges, merged and sorted by start,
+    so a lookup is a single binary search.
+    """
+
+    __slots__ = ("_starts", "_ends", "_transitions")
+
+    def __init__(self, intervals: Iterable[Window]) -> None:
+        """Initialize the schedule from minute-of-week intervals."""
+        starts: list[int] = []
+        ends: list[int] = []
+        for start, end in sorted(intervals):
+            if start >= end:
+                continue
+            if ends and start <= ends[-1]:
+                ends[-1] = max(ends[-1], end)
+            else:
+                starts.append(start)
+                ends.append(end)
+        self._starts = starts
+        self._ends = ends
+
+        # Minutes at which the allowed state flips; a window running into the
+        # next week joins the one starting on Monday 00:00
+        transitions = set(starts)
+        transitions.update(end % MINUTES_PER_WEEK for end in ends)
+        if ends and ends[-1] == MINUTES_PER_WEEK and starts[0] == 0:
+            transitions.discard(0)
+        self._transitions = sorted(transitions)
+
+    @classmethod
+    def compile(
+        cls,
+        default_windows: list[Window],
+        weekday_windows: Mapping[int, list[Window]] | None = None,
+        previous_windows: list[Window] | None = None,
+    ) -> WeeklySchedule:
+        """Compile per-weekday windows, falling back to the default windows.
+
+        Windows crossing midnight into Monday are taken from previous_windows,
+        those of the Sunday before the week, as the windows of the week's own
+        Sunday run into the next week.
+        """
+        weekday_windows = weekday_windows or {}
+        if previous_windows is None:
+            previous_windows = default_windows
+        intervals: list[Window] = [
+            (0, end) for start, end in previous_windows if start > end
+        ]
+        for day in range(7):
+            windows = weekday_windows.get(day, default_windows)
+            offset = day * MINUTES_PER_DAY
+            for start, end in windows:
+                if start < end:
+                    intervals.append((offset + start, offset + end))
+                elif start > end:
+                    # Crosses midnight, the tail belongs to the next day
+                    intervals.append((offset + start, offset + MINUTES_PER_DAY))
+                    if day < 6:
+                        intervals.append(
+                            (offset + MINUTES_PER_DAY, offset + MINUTES_PER_DAY + end)
+                        )
+        return cls(intervals)
+
+    @property
+    def intervals(self) -> list[Window]:
+        """Return the compiled minute-of-week intervals."""
+        return list(zip(self._starts, self._ends))
+
+    def is_allowed(self, minute: int) -> bool:
+        """Return whether a minute of the week lies inside an allowed window."""
+        index = bisect_right(self._starts, minute) - 1
+        return index >= 0 and minute < self._ends[index]
+
+    def state_at(self, now: datetime) -> ScheduleState:
+        """Return the state of the schedule at a local time.
+
+        The state expires with the next transition, or at the end of the week
+        as the next week may be compiled with other exceptions. The expiry
+        is given in UTC so it compares correctly while the clock is turned
+        back.
+        """
+        start = schedule_time(now)
+        minute = minute_of_week(start)
+        delta = self.next_transition(minute)
+        if delta is None or delta > MINUTES_PER_WEEK - minute:
+            delta = MINUTES_PER_WEEK - minute
+        return ScheduleState(
+            self.is_allowed(minute),
+            self.window_at(minute),
+            self.previous_end(minute),
+            self.next_start(minute),
+            wall_time_after(start, delta).astimezone(timezone.utc),
+        )
+
+    def window_at(self, minute: int) -> Window | None:
+        """Return the allowed window containing a minute of the week.
+
+        Outside the windows the next one is returned, None if there is none.
+        """
+        if not self._starts:
+            return None
+        index = bisect_right(self._starts, minute) - 1
+        if index >= 0 and minute < self._ends[index]:
+            return self._starts[index], self._ends[index]
+        index = (index + 1) % len(self._starts)
+        return self._starts[index], self._ends[index]
+
+    def next_start(self, minute: int) -> int | None:
+        """Return the minute of the week the next allowed window starts."""
+        if not self._starts:
+            return None
+        index = bisect_right(self._starts, minute)
+        if index < len(self._starts):
+            return self._starts[index]
+        return self._starts[0]
+
+    def previous_end(self, minute: int) -> int | None:
+        """Return the minute of the week the last allowed window ended."""
+        if not self._ends:
+            return None
+        index = bisect_right(self._ends, minute) - 1
+        return self._ends[index]
+
+    def next_transition(self, minute: int) -> int | None:
+        """Return the minutes until the allowed state changes next.
+
+        None is returned if the state never changes.
+        """
+        if not self._transitions:
+            return None
+        index = bisect_right(self._transitions, minute)
+        if index < len(self._transitions):
+            return self._transitions[index] - minute
+        return self._transitions[0] + MINUTES_PER_WEEK - minute
+
+    def upcoming_transitions(self, minute: int, horizon: int) -> Iterator[tuple[int, bool]]:
+        """Yield the state changes within the next horizon minutes.
+
+        Every change is yielded as the minutes until it happens and whether
+        playback is allowed from then on.
+        """
+        transitions = self._transitions
+        if not transitions:
+            return
+        allowed = self.is_allowed(minute)
+        index = bisect_right(transitions, minute)
+        offset = 0
+        while True:
+            if index == len(transitions):
+                index = 0
+                offset += MINUTES_PER_WEEK
+            if (delta := transitions[index] + offset - minute) > horizon:
+                return
+            allowed = not allowed
+            yield delta, allowed
+            index += 1
@@ -0,0 +1,154 @@
+"""Sensor platform for Alexa Time Control."""
+from __future__ import annotations
+
+from datetime import timedelta
+import logging
+import time
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.util import dt as dt_util
+
+from .const import CONF_DAILY_BUDGET
+from .metrics import EnforcementMetrics
+from .entity import async_get_entry_devices
+from .usage import PlaybackUsage, day_position
+
+_LOGGER = logging.getLogger(__name__)
+
+# The metrics are read from memory, polling them keeps the playback handler
+# free of any state writes
+SCAN_INTERVAL = timedelta(seconds=60)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up the sensor entities of every media player of the entry."""
+    entities: list[SensorEntity] = []
+    for data in async_get_entry_devices(hass, entry):
+        alexa_entity_id = data.alexa_entity_id
+        device_info = data.device_info
+        metrics = data.metrics
+
+        entities += [
+            AlexaTimeControlStopsSensor(alexa_entity_id, device_info, metrics),
+            AlexaTimeControlLatencySensor(
+                alexa_entity_id, device_info, metrics, "decision_latency"
+            ),
+            AlexaTimeControlLatencySensor(
+                alexa_entity_id, device_info, metrics, "time_to_silence"
+            ),
+            AlexaTimeControlRemainingSensor(
+                entry, alexa_entity_id, device_info, data.usage
+            ),
+        ]
+
+    async_add_entities(entities)
+
+
+class AlexaTimeControlSensor(SensorEntity):
+    """Base class of the enforcement metric sensors."""
+
+    _attr_has_entity_name = True
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+
+    def __init__(
+        self,
+        alexa_entity_id: str,
+        device_info: DeviceInfo | None,
+        metrics: EnforcementMetrics,
+        translation_key: str,
+    ) -> None:
+        """Initialize the sensor entity."""
+        self._metrics = metrics
+        self._attr_unique_id = f"{alexa_entity_id}_{translation_key}"
+        self._attr_translation_key = translation_key
+        self._attr_device_info = device_info
+
+
+class AlexaTimeControlStopsSensor(AlexaTimeControlSensor):
+    """Representation of the number of stopped playbacks."""
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def __init__(
+        self,
+        alexa_entity_id: str,
+        device_info: DeviceInfo | None,
+        metrics: EnforcementMetrics,
+    ) -> None:
+        """Initialize the sensor entity."""
+        super().__init__(alexa_entity_id, device_info, metrics, "stops")
+
+    @property
+    def native_value(self) -> int:
+        """Return how often playback was stopped."""
+        return self._metrics.stops
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the count of every decision."""
+        return dict(self._metrics.decisions)
+
+
+class AlexaTimeControlLatencySensor(AlexaTimeControlSensor):
+    """Representation of an enforcement latency."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_suggested_display_precision = 1
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the latency in milliseconds."""
+        if self._attr_translation_key == "decision_latency":
+            value = self._metrics.decision_latency.mean
+        else:
+            value = self._metrics.last_silence
+        return value * 1000 if value is not None else None
+
+
+class AlexaTimeControlRemainingSensor(SensorEntity):
+    """Representation of the playback time left today."""
+
+    _attr_has_entity_name = True
+    _attr_translation_key = "remaining_playback_time"
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MINUTES
+    _attr_suggested_display_precision = 0
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        alexa_entity_id: str,
+        device_info: DeviceInfo | None,
+        usage: PlaybackUsage,
+    ) -> None:
+        """Initialize the sensor entity."""
+        self._entry = entry
+        self._usage = usage
+        self._attr_unique_id = f"{alexa_entity_id}_remaining_playback_time"
+        self._attr_device_info = device_info
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the minutes left of the daily budget."""
+        if not (budget := self._entry.options.get(CONF_DAILY_BUDGET)):
+            return None
+        now = time.monotonic()
+        self._usage.roll(*day_position(dt_util.now()), now)
+        return max(0.0, budget - self._usage.used_at(now) / 60)
@@ -0,0 +1,476 @@
+"""Services for the Alexa Time Control integration."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Coroutine, Iterator
+from datetime import datetime, timedelta
+from functools import partial
+from itertools import islice
+import logging
+from typing import Any, TextIO
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.json import json_dumps
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+from homeassistant.util import dt as dt_util
+
+from .audit import AuditLog
+from .const import DATA_DISPATCHER, DATA_EXCEPTIONS, DATA_PROFILER, DOMAIN
+from .profiling import EnforcementProfiler, async_stop_profiler, profile_path
+from .recording import EventRecorder
+from .runtime import AlexaTimeControlData
+from .schedule import (
+    MINUTES_PER_WEEK,
+    WeeklySchedule,
+    minute_of_week,
+    schedule_time,
+    wall_time_after,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+SERVICE_SET_CONTROLS = "set_controls"
+SERVICE_EXPORT_AUDIT_LOG = "export_audit_log"
+SERVICE_PREVIEW_SCHEDULE = "preview_schedule"
+SERVICE_START_RECORDING = "start_recording"
+SERVICE_STOP_RECORDING = "stop_recording"
+SERVICE_RELOAD_EXCEPTIONS = "reload_exceptions"
+SERVICE_START_PROFILING = "start_profiling"
+SERVICE_STOP_PROFILING = "stop_profiling"
+
+ATTR_ENABLED = "enabled"
+ATTR_BLOCKED = "blocked"
+ATTR_START_TIME = "start_time"
+ATTR_END_TIME = "end_time"
+ATTR_PATH = "path"
+ATTR_HORIZON = "horizon"
+ATTR_COUNT = "count"
+ATTR_DURATION = "duration"
+
+# Upper bound of concurrent stop calls issued by a single service call
+MAX_CONCURRENT_STOPS = 8
+
+# Number of audit records written to the export file at once
+EXPORT_CHUNK_SIZE = 64
+
+SET_CONTROLS_SCHEMA = vol.All(
+    cv.make_entity_service_schema(
+        {
+            vol.Optional(ATTR_ENABLED): cv.boolean,
+            vol.Optional(ATTR_BLOCKED): cv.boolean,
+            vol.Optional(ATTR_START_TIME): cv.time,
+            vol.Optional(ATTR_END_TIME): cv.time,
+        }
+    ),
+    cv.has_at_least_one_key(ATTR_ENABLED, ATTR_BLOCKED, ATTR_START_TIME, ATTR_END_TIME),
+)
+
+EXPORT_AUDIT_LOG_SCHEMA = cv.make_entity_service_schema(
+    {vol.Required(ATTR_PATH): cv.string}
+)
+
+# Service call keys that select a target
+TARGET_FIELDS = {str(key) for key in cv.ENTITY_SERVICE_FIELDS}
+
+PREVIEW_SCHEDULE_SCHEMA = vol.Schema(
+    {
+        # The frontend stores data here
+        vol.Remove("metadata"): dict,
+        **cv.ENTITY_SERVICE_FIELDS,
+        vol.Optional(ATTR_HORIZON, default=24): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=7 * 24)
+        ),
+        vol.Optional(ATTR_COUNT, default=10): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=100)
+        ),
+    }
+)
+
+START_RECORDING_SCHEMA = vol.Schema({vol.Required(ATTR_PATH): cv.string})
+
+START_PROFILING_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_DURATION, default=60): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=3600)
+        ),
+    }
+)
+
+ControlsUpdatedAction = Callable[[HomeAssistant, str], Coroutine[Any, Any, bool]]
+ScheduleGetter = Callable[[HomeAssistant, str, datetime], WeeklySchedule]
+ExceptionsReloader = Callable[[HomeAssistant, str], Coroutine[Any, Any, None]]
+
+
+@callback
+def async_setup_services(
+    hass: HomeAssistant,
+    controls_updated: ControlsUpdatedAction,
+    get_schedule: ScheduleGetter,
+    reload_exceptions: ExceptionsReloader,
+) -> None:
+    """Register the Alexa Time Control services.
+
+    controls_updated is awaited for every device changed by a service call
+    and returns whether its playback had to be stopped; get_schedule returns
+    the compiled schedule of a device for the week of a local time;
+    reload_exceptions reads the exception calendar of a device again.
+    """
+
+    async def async_set_controls(call: ServiceCall) -> ServiceResponse:
+        """Set the controls of all targeted devices at once."""
+        selected = async_extract_referenced_entity_ids(hass, call)
+        entity_ids = selected.referenced | selected.indirectly_referenced
+        # The controls of a group are shared, so targeting one of its media
+        # players changes all of them
+        device_keys = _async_resolve_devices(hass, entity_ids, whole_groups=True)
+
+        # Apply every value before yielding to the event loop, so all state
+        # writes of the call happen in a single batch. The entities of a
+        # group are shared by its devices and applied once
+        results: dict[str, dict[str, Any]] = {}
+        applied: set[str] = set()
+        for device_key in device_keys:
+            entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+            entities = entry_data.entities
+            updated = []
+            for key in (ATTR_ENABLED, ATTR_BLOCKED, ATTR_START_TIME, ATTR_END_TIME):
+                if key not in call.data or (entity := entities.get(key)) is None:
+                    continue
+                if entity.entity_id not in applied:
+                    applied.add(entity.entity_id)
+                    if key in (ATTR_ENABLED, ATTR_BLOCKED):
+                        entity.async_apply_state(call.data[key])
+                    else:
+                        entity.async_apply_value(call.data[key])
+                updated.append(key)
+            results[entry_data.alexa_entity_id] = {"updated": updated}
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_STOPS)
+
+        async def _async_controls_updated(device_key: str) -> bool:
+            """Apply the changed controls of a device, bounded by the semaphore."""
+            async with semaphore:
+                return await controls_updated(hass, device_key)
+
+        outcomes = await asyncio.gather(
+            *(_async_controls_updated(device_key) for device_key in device_keys),
+            return_exceptions=True,
+        )
+        for result, outcome in zip(results.values(), outcomes):
+            if isinstance(outcome, Exception):
+                _LOGGER.error("Error applying controls: %s", outcome)
+                result["error"] = str(outcome)
+            else:
+                result["stopped"] = outcome
+
+        return {"devices": results}
+
+    async def async_export_audit_log(call: ServiceCall) -> ServiceResponse:
+        """Write the audit log of all targeted devices to a JSONL file."""
+        path = hass.config.path(call.data[ATTR_PATH])
+        await _async_check_allowed_path(hass, path)
+
+        selected = async_extract_referenced_entity_ids(hass, call)
+        device_keys = _async_resolve_devices(
+            hass, selected.referenced | selected.indirectly_referenced
+        )
+        try:
+            file = await hass.async_add_executor_job(
+                partial(open, path, "w", encoding="utf-8")
+            )
+        except OSError as err:
+            raise _open_error(path, err) from err
+        records = 0
+        try:
+            for device_key in device_keys:
+                if (entry_data := hass.data[DOMAIN].get(device_key)) is None:
+                    continue
+                records += await _async_write_audit_log(
+                    hass, file, entry_data.alexa_entity_id, entry_data.audit
+                )
+        finally:
+            await hass.async_add_executor_job(file.close)
+
+        return {"path": path, "records": records}
+
+    @callback
+    def async_preview_schedule(call: ServiceCall) -> ServiceResponse:
+        """Return the upcoming allowed/forbidden changes of the devices.
+
+        All devices are previewed if none is targeted.
+        """
+        if call.data.keys() & TARGET_FIELDS:
+            selected = async_extract_referenced_entity_ids(hass, call)
+            device_keys = _async_resolve_devices(
+                hass, selected.referenced | selected.indirectly_referenced
+            )
+        else:
+            device_keys = list(hass.data.get(DOMAIN, {}))
+
+        # One point in time for all devices, each one is a walk over its
+        # compiled schedules
+        now = schedule_time(dt_util.now())
+        horizon = call.data[ATTR_HORIZON] * 60
+        devices: dict[str, dict[str, Any]] = {}
+        for device_key in device_keys:
+            entry_data: AlexaTimeControlData = hass.data[DOMAIN][device_key]
+            enabled, blocked = entry_data.enabled, entry_data.blocked
+            preview: dict[str, Any] = {
+                ATTR_ENABLED: enabled,
+                ATTR_BLOCKED: blocked,
+                "allowed": not enabled,
+                "transitions": [],
+            }
+            devices[entry_data.alexa_entity_id] = preview
+
+            # Nothing changes by time while disabled or blocked
+            if not enabled:
+                continue
+            if blocked:
+                preview["allowed"] = False
+                continue
+
+            try:
+                (_, preview["allowed"]), *transitions = islice(
+                    _preview_transitions(hass, device_key, get_schedule, now, horizon),
+                    call.data[ATTR_COUNT] + 1,
+                )
+            except ValueError as err:
+                preview["error"] = str(err)
+                continue
+
+            preview["transitions"] = [
+                {
+                    "time": wall_time_after(now, delta).isoformat(),
+                    "allowed": allowed,
+                }
+                for delta, allowed in transitions
+            ]
+
+        return {"devices": devices}
+
+    async def async_start_recording(call: ServiceCall) -> None:
+        """Start recording the state changes of all devices to a JSONL file."""
+        dispatcher = hass.data[DATA_DISPATCHER]
+        if dispatcher.recorder is not None:
+            raise ServiceValidationError(
+                f"Already recording to {dispatcher.recorder.path}"
+            )
+
+        path = hass.config.path(call.data[ATTR_PATH])
+        await _async_check_allowed_path(hass, path)
+
+        recorder = EventRecorder(hass, path)
+        try:
+            await recorder.async_start()
+        except OSError as err:
+            raise _open_error(path, err) from err
+        dispatcher.recorder = recorder
+
+    async def async_stop_recording(call: ServiceCall) -> ServiceResponse:
+        """Stop recording and close the file."""
+        dispatcher = hass.data[DATA_DISPATCHER]
+        if (recorder := dispatcher.recorder) is None:
+            raise ServiceValidationError("Not recording")
+
+        dispatcher.recorder = None
+        await recorder.async_stop()
+        return {"path": recorder.path, "events": recorder.events}
+
+    async def async_start_profiling(call: ServiceCall) -> ServiceResponse:
+        """Profile the enforcement path for a number of seconds."""
+        if (profiler := hass.data.get(DATA_PROFILER)) is not None:
+            raise ServiceValidationError(f"Already profiling to {profiler.path}")
+
+        profiler = hass.data[DATA_PROFILER] = EnforcementProfiler(
+            hass, profile_path(hass)
+        )
+        await profiler.async_start(timedelta(seconds=call.data[ATTR_DURATION]))
+        return {"path": profiler.path}
+
+    async def async_stop_profiling(call: ServiceCall) -> ServiceResponse:
+        """Stop profiling and write the report."""
+        if (profiler := hass.data.get(DATA_PROFILER)) is None:
+            raise ServiceValidationError("Not profiling")
+
+        await async_stop_profiler(hass, profiler)
+        return {"path": profiler.path, "calls": profiler.calls}
+
+    async def async_reload_exceptions(call: ServiceCall) -> None:
+        """Read the exception calendars of all devices again."""
+        hass.data.pop(DATA_EXCEPTIONS, None)
+        errors = []
+        for device_key in list(hass.data.get(DOMAIN, {})):
+            try:
+                await reload_exceptions(hass, device_key)
+            except ValueError as err:
+                errors.append(str(err))
+        if errors:
+            raise ServiceValidationError("; ".join(dict.fromkeys(errors)))
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_CONTROLS,
+        async_set_controls,
+        schema=SET_CONTROLS_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_AUDIT_LOG,
+        async_export_audit_log,
+        schema=EXPORT_AUDIT_LOG_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_PREVIEW_SCHEDULE,
+        async_preview_schedule,
+        schema=PREVIEW_SCHEDULE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_RECORDING,
+        async_start_recording,
+        schema=START_RECORDING_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_RECORDING,
+        async_stop_recording,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN, SERVICE_RELOAD_EXCEPTIONS, async_reload_exceptions
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_PROFILING,
+        async_start_profiling,
+        schema=START_PROFILING_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_PROFILING,
+        async_stop_profiling,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def _preview_transitions(
+    hass: HomeAssistant,
+    device_key: str,
+    get_schedule: ScheduleGetter,
+    now: datetime,
+    horizon: int,
+) -> Iterator[tuple[int, bool]]:
+    """Yield the state of a device's schedule now and its changes within a horizon.
+
+    Both are yielded as the minutes from now and whether playback is allowed.
+    The schedule of every week is walked separately, as weeks may differ by
+    their exceptions.
+    """
+    minute = minute_of_week(now)
+    elapsed = 0
+    schedule = get_schedule(hass, device_key, now)
+    yield 0, (allowed := schedule.is_allowed(minute))
+
+    while True:
+        week_left = MINUTES_PER_WEEK - minute
+        for delta, allowed in schedule.upcoming_transitions(
+            minute, min(horizon - elapsed, week_left - 1)
+        ):
+            yield elapsed + delta, allowed
+        if (elapsed := elapsed + week_left) > horizon:
+            return
+
+        # The next week may start with another state
+        minute = 0
+        schedule = get_schedule(hass, device_key, wall_time_after(now, elapsed))
+        if schedule.is_allowed(0) != allowed:
+            yield elapsed, (allowed := not allowed)
+
+
+@callback
+def _async_resolve_devices(
+    hass: HomeAssistant, entity_ids: set[str], whole_groups: bool = False
+) -> list[str]:
+    """Return the devices whose media player or control entities are targeted.
+
+    With whole_groups, every device of an entry is returned once one of
+    them is targeted.
+    """
+    devices: dict[str, AlexaTimeControlData] = hass.data.get(DOMAIN, {})
+    device_keys = [
+        device_key
+        for device_key, entry_data in devices.items()
+        if entry_data.alexa_entity_id in entity_ids
+        or any(
+            entity.entity_id in entity_ids
+            for entity in entry_data.entities.values()
+        )
+    ]
+    if whole_groups:
+        entry_ids = {devices[device_key].entry_id for device_key in device_keys}
+        device_keys = [
+            device_key
+            for device_key, entry_data in devices.items()
+            if entry_data.entry_id in entry_ids
+        ]
+    return device_keys
+
+
+async def _async_check_allowed_path(hass: HomeAssistant, path: str) -> None:
+    """Raise ServiceValidationError if a file may not be written to."""
+    if not await hass.async_add_executor_job(hass.config.is_allowed_path, path):
+        raise ServiceValidationError(
+            f"Cannot write to {path}, it is not in allowlist_external_dirs",
+            translation_domain=DOMAIN,
+            translation_key="path_not_allowed",
+            translation_placeholders={"path": path},
+        )
+
+
+def _open_error(path: str, err: OSError) -> ServiceValidationError:
+    """Return the error of a file that cannot be opened for writing."""
+    reason = err.strerror or str(err)
+    return ServiceValidationError(
+        f"Cannot open {path}: {reason}",
+        translation_domain=DOMAIN,
+        translation_key="cannot_open",
+        translation_placeholders={"path": path, "reason": reason},
+    )
+
+
+async def _async_write_audit_log(
+    hass: HomeAssistant, file: TextIO, entity_id: str, audit: AuditLog
+) -> int:
+    """Write the records of an audit log as JSON lines, a chunk at a time.
+
+    Only one chunk of lines is held in memory; the log keeps recording while
+    a chunk is written. Returns the number of records written.
+    """
+    records = 0
+    lines: list[str] = []
+    for record in audit:
+        lines.append(f"{json_dumps(record.as_dict(entity_id))}\n")
+        if len(lines) == EXPORT_CHUNK_SIZE:
+            await hass.async_add_executor_job(file.writelines, lines)
+            records += len(lines)
+            lines = []
+    if lines:
+        await hass.async_add_executor_job(file.writelines, lines)
+        records += len(lines)
+    return records
@@ -0,0 +1,56 @@
+"""Persistent control state for Alexa Time Control."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN
+
+STORAGE_KEY = DOMAIN
+STORAGE_VERSION = 1
+
+# Seconds to coalesce changes before they are written to disk
+SAVE_DELAY = 5
+
+
+class AlexaTimeControlStore:
+    """Hold the control values of all entries in a single store.
+
+    Values are kept in memory and written with a delay, so changes made in
+    quick succession, e.g. by a bulk service call, end up in one write.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the store."""
+        self._store: Store[dict[str, dict[str, Any]]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY
+        )
+        self._data: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the stored values."""
+        self._data = await self._store.async_load() or {}
+
+    @callback
+    def async_get(self, entry_id: str, key: str, default: Any = None) -> Any:
+        """Return a stored value of an entry."""
+        return self._data.get(entry_id, {}).get(key, default)
+
+    @callback
+    def async_set(self, entry_id: str, key: str, value: Any) -> None:
+        """Store a value of an entry and schedule a save."""
+        self._data.setdefault(entry_id, {})[key] = value
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_remove_entry(self, entry_id: str) -> None:
+        """Remove the values of an entry."""
+        if self._data.pop(entry_id, None) is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, dict[str, Any]]:
+        """Return the data to store."""
+        return self._data
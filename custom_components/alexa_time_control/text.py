@@ -6,11 +6,10 @@ import logging
 from homeassistant.components.text import TextEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
-from homeassistant.helpers import device_registry as dr, entity_registry as er
-from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
+from .entity import AlexaTimeControlEntity, async_get_entry_devices
+from .runtime import AlexaTimeControlData
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,56 +20,33 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the text entities."""
-    alexa_entity_id = entry.data["alexa_entity_id"]
-    
-    # Get the device info from the existing Alexa entity
-    entity_reg = er.async_get(hass)
-    alexa_entity = entity_reg.async_get(alexa_entity_id)
-    
-    device_info = None
-    if alexa_entity and alexa_entity.device_id:
-        device_reg = dr.async_get(hass)
-        device = device_reg.async_get(alexa_entity.device_id)
-        if device:
-            device_info = DeviceInfo(
-                identifiers=device.identifiers,
-            )
+    devices = async_get_entry_devices(hass, entry)
 
     entities = [
-        AlexaTimeControlText(
-            entry.entry_id,
-            alexa_entity_id,
-            device_info,
-            "name",
-        ),
+        AlexaTimeControlText(entry, devices, "name"),
     ]
 
     async_add_entities(entities)
 
 
-class AlexaTimeControlText(TextEntity):
+class AlexaTimeControlText(AlexaTimeControlEntity, TextEntity):
     """Representation of a name text entity."""
 
-    _attr_has_entity_name = True
     _attr_native_min = 0
     _attr_native_max = 100
 
     def __init__(
         self,
-        entry_id: str,
-        alexa_entity_id: str,
-        device_info: DeviceInfo | None,
+        entry: ConfigEntry,
+        devices: list[AlexaTimeControlData],
         translation_key: str,
     ) -> None:
         """Initialize the text entity."""
-        self._entry_id = entry_id
-        self._alexa_entity_id = alexa_entity_id
-        self._attr_unique_id = f"{alexa_entity_id}_{translation_key}"
-        self._attr_translation_key = translation_key
-        self._attr_native_value = ""
-        self._attr_device_info = device_info
+        super().__init__(entry, devices, translation_key)
+        self._attr_native_value = self._value
 
     async def async_set_value(self, value: str) -> None:
         """Update the current value."""
         self._attr_native_value = value
+        self._async_store(value, value)
         self.async_write_ha_state()
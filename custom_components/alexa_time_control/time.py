@@ -6,12 +6,11 @@ from datetime import time
 
 from homeassistant.components.time import TimeEntity
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers import device_registry as dr, entity_registry as er
-from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .const import DOMAIN
+from .entity import AlexaTimeControlEntity, async_get_entry_devices
+from .runtime import AlexaTimeControlData
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,61 +21,28 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up the time entities."""
-    alexa_entity_id = entry.data["alexa_entity_id"]
-    
-    # Get the device info from the existing Alexa entity
-    entity_reg = er.async_get(hass)
-    alexa_entity = entity_reg.async_get(alexa_entity_id)
-    
-    device_info = None
-    if alexa_entity and alexa_entity.device_id:
-        device_reg = dr.async_get(hass)
-        device = device_reg.async_get(alexa_entity.device_id)
-        if device:
-            device_info = DeviceInfo(
-                identifiers=device.identifiers,
-            )
+    devices = async_get_entry_devices(hass, entry)
 
     entities = [
-        AlexaTimeControlTime(
-            entry.entry_id,
-            alexa_entity_id,
-            device_info,
-            "start_time",
-            time(8, 0),
-        ),
-        AlexaTimeControlTime(
-            entry.entry_id,
-            alexa_entity_id,
-            device_info,
-            "end_time",
-            time(20, 0),
-        ),
+        AlexaTimeControlTime(entry, devices, "start_time"),
+        AlexaTimeControlTime(entry, devices, "end_time"),
     ]
 
     async_add_entities(entities)
 
 
-class AlexaTimeControlTime(TimeEntity):
+class AlexaTimeControlTime(AlexaTimeControlEntity, TimeEntity):
     """Representation of a time control time entity."""
 
-    _attr_has_entity_name = True
-
     def __init__(
         self,
-        entry_id: str,
-        alexa_entity_id: str,
-        device_info: DeviceInfo | None,
+        entry: ConfigEntry,
+        devices: list[AlexaTimeControlData],
         translation_key: str,
-        default_time: time,
     ) -> None:
         """Initialize the time entity."""
-        self._entry_id = entry_id
-        self._alexa_entity_id = alexa_entity_id
-        self._attr_unique_id = f"{alexa_entity_id}_{translation_key}"
-        self._attr_translation_key = translation_key
-        self._attr_native_value = default_time
-        self._attr_device_info = device_info
+        super().__init__(entry, devices, translation_key)
+        self._attr_native_value = self._value
         
         # Set icon based on translation key
         if translation_key == "start_time":
@@ -84,7 +50,14 @@ class AlexaTimeControlTime(TimeEntity):
         elif translation_key == "end_time":
             self._attr_icon = "mdi:clock-end"
 
-    async def async_set_value(self, value: time) -> None:
-        """Update the current value."""
+    @callback
+    def async_apply_value(self, value: time) -> None:
+        """Store and write a new value without notifying the integration."""
         self._attr_native_value = value
+        self._async_store(value, value.isoformat())
         self.async_write_ha_state()
+
+    async def async_set_value(self, value: time) -> None:
+        """Update the current value."""
+        self.async_apply_value(value)
+        self._async_notify()
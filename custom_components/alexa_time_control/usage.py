@@ -0,0 +1,67 @@
+"""Daily playback time accounting for Alexa Time Control."""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any
+
+
+def day_position(now: datetime) -> tuple[int, float]:
+    """Return the date ordinal of a datetime and the seconds since midnight."""
+    since_midnight = now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+    return now.toordinal(), since_midnight
+
+
+class PlaybackUsage:
+    """Playback time of a device on a single day.
+
+    Only the running day's total and the monotonic start of the current
+    playback are kept, so memory does not grow with the number of events.
+    """
+
+    __slots__ = ("day", "used", "_playing_since")
+
+    def __init__(self, day: int, used: float = 0.0) -> None:
+        """Initialize the usage of a day, given as a date ordinal."""
+        self.day = day
+        self.used = used
+        self._playing_since: float | None = None
+
+    @property
+    def playing(self) -> bool:
+        """Return whether playback is being accounted right now."""
+        return self._playing_since is not None
+
+    def roll(self, day: int, since_midnight: float, now: float) -> bool:
+        """Start a new day if needed, returns whether the day changed.
+
+        Playback running across midnight only counts towards the new day from
+        midnight on.
+        """
+        if day == self.day:
+            return False
+        self.day = day
+        self.used = 0.0
+        if self._playing_since is not None:
+            self._playing_since = max(self._playing_since, now - since_midnight)
+        return True
+
+    def start(self, now: float) -> None:
+        """Start accounting playback at monotonic time now."""
+        if self._playing_since is None:
+            self._playing_since = now
+
+    def stop(self, now: float) -> None:
+        """Stop accounting playback at monotonic time now."""
+        if self._playing_since is not None:
+            self.used += now - self._playing_since
+            self._playing_since = None
+
+    def used_at(self, now: float) -> float:
+        """Return the seconds played today, including the current playback."""
+        if self._playing_since is None:
+            return self.used
+        return self.used + now - self._playing_since
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the day's aggregate for storage."""
+        return {"day": self.day, "used": round(self.used, 1)}
@@ -0,0 +1,31 @@
+"""Tests for the Alexa Time Control integration."""
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.alexa_time_control.store import STORAGE_KEY, STORAGE_VERSION
+
+ENTRY_ID = "test_entry"
+MEDIA_PLAYER = "media_player.echo"
+
+
+def store_values(hass_storage: dict[str, Any], key: str, **values: Any) -> None:
+    """Store the values of an entry or device before the integration loads."""
+    hass_storage[STORAGE_KEY] = {
+        "version": STORAGE_VERSION,
+        "minor_version": 1,
+        "key": STORAGE_KEY,
+        "data": {key: values},
+    }
+
+
+def forbidden_window() -> dict[str, str]:
+    """Return the start and end time of an allowed window starting in an hour."""
+    now = dt_util.now().replace(microsecond=0)
+    return {
+        "start_time": (now + timedelta(hours=1)).time().isoformat(),
+        "end_time": (now + timedelta(hours=2)).time().isoformat(),
+    }
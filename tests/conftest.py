@@ -0,0 +1,26 @@
+"""Fixtures for the Alexa Time Control tests."""
+from __future__ import annotations
+
+from collections.abc import Generator
+
+import pytest
+
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.setup import async_setup_component
+
+from pytest_homeassistant_custom_component.common import async_mock_service
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(
+    enable_custom_integrations: None,
+) -> Generator[None, None, None]:
+    """Enable the custom integration in every test."""
+    yield
+
+
+@pytest.fixture
+async def media_stop_calls(hass: HomeAssistant) -> list[ServiceCall]:
+    """Record the media_stop calls, replacing the media player service."""
+    assert await async_setup_component(hass, "media_player", {})
+    return async_mock_service(hass, "media_player", "media_stop")
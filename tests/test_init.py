@@ -0,0 +1,103 @@
+"""Tests for the setup of Alexa Time Control."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntryDisabler
+from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.helpers import device_registry as dr, entity_registry as er
+from homeassistant.setup import async_setup_component
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.alexa_time_control.const import (
+    CONF_ALEXA_ENTITY_IDS,
+    CONF_STOP_RETRIES,
+    DATA_DISCOVERY,
+    DATA_STORE,
+    DOMAIN,
+)
+
+from . import ENTRY_ID, MEDIA_PLAYER, forbidden_window, store_values
+
+
+async def test_stops_playback_running_at_setup(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    media_stop_calls: list[ServiceCall],
+) -> None:
+    """Test a player already playing in a forbidden window is stopped at setup."""
+    store_values(hass_storage, ENTRY_ID, enabled=True, **forbidden_window())
+    hass.states.async_set(MEDIA_PLAYER, "playing")
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        entry_id=ENTRY_ID,
+        version=2,
+        data={CONF_ALEXA_ENTITY_IDS: [MEDIA_PLAYER]},
+        options={CONF_STOP_RETRIES: 0},
+    )
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert len(media_stop_calls) == 1
+    assert media_stop_calls[0].data == {"entity_id": MEDIA_PLAYER}
+
+
+async def test_entities_follow_linked_device(
+    hass: HomeAssistant,
+    device_registry: dr.DeviceRegistry,
+    entity_registry: er.EntityRegistry,
+) -> None:
+    """Test the entities move to the device the media player is linked to."""
+    alexa_entry = MockConfigEntry(domain="alexa_media")
+    alexa_entry.add_to_hass(hass)
+    device = device_registry.async_get_or_create(
+        config_entry_id=alexa_entry.entry_id, identifiers={("alexa_media", "echo")}
+    )
+    entity_registry.async_get_or_create(
+        "media_player", "alexa_media", "echo", suggested_object_id="echo"
+    )
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        entry_id=ENTRY_ID,
+        version=2,
+        data={CONF_ALEXA_ENTITY_IDS: [MEDIA_PLAYER]},
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    entities = er.async_entries_for_config_entry(entity_registry, entry.entry_id)
+    assert entities
+    assert all(entity.device_id is None for entity in entities)
+
+    entity_registry.async_update_entity(MEDIA_PLAYER, device_id=device.id)
+    await hass.async_block_till_done()
+
+    entities = er.async_entries_for_config_entry(entity_registry, entry.entry_id)
+    assert all(entity.device_id == device.id for entity in entities)
+
+
+async def test_remove_unmigrated_entry(
+    hass: HomeAssistant, hass_storage: dict[str, Any]
+) -> None:
+    """Test removing an entry of version 1 that was never set up."""
+    store_values(hass_storage, ENTRY_ID, enabled=True)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        entry_id=ENTRY_ID,
+        version=1,
+        data={"alexa_entity_id": MEDIA_PLAYER},
+        disabled_by=ConfigEntryDisabler.USER,
+    )
+    entry.add_to_hass(hass)
+    assert await async_setup_component(hass, DOMAIN, {})
+    assert MEDIA_PLAYER in hass.data[DATA_DISCOVERY].configured
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert hass.data[DATA_STORE].async_get(ENTRY_ID, "enabled") is None
+    assert MEDIA_PLAYER not in hass.data[DATA_DISCOVERY].configured
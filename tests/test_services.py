@@ -0,0 +1,50 @@
+"""Tests for the services of Alexa Time Control."""
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.setup import async_setup_component
+
+from custom_components.alexa_time_control.const import DOMAIN
+from custom_components.alexa_time_control.services import (
+    SERVICE_EXPORT_AUDIT_LOG,
+    SERVICE_START_RECORDING,
+)
+
+
+async def test_export_audit_log_missing_directory(
+    hass: HomeAssistant, tmp_path: Path
+) -> None:
+    """Test exporting to an allowed path in a missing directory fails cleanly."""
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    assert await async_setup_component(hass, DOMAIN, {})
+    path = tmp_path / "missing" / "audit.jsonl"
+
+    with pytest.raises(ServiceValidationError, match="Cannot open") as err:
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_EXPORT_AUDIT_LOG,
+            {"entity_id": "media_player.echo", "path": str(path)},
+            blocking=True,
+            return_response=True,
+        )
+    assert err.value.translation_key == "cannot_open"
+
+
+async def test_start_recording_missing_directory(
+    hass: HomeAssistant, tmp_path: Path
+) -> None:
+    """Test recording to an allowed path in a missing directory fails cleanly."""
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    assert await async_setup_component(hass, DOMAIN, {})
+    path = tmp_path / "missing" / "recording.jsonl"
+
+    with pytest.raises(ServiceValidationError, match="Cannot open") as err:
+        await hass.services.async_call(
+            DOMAIN, SERVICE_START_RECORDING, {"path": str(path)}, blocking=True
+        )
+    assert err.value.translation_key == "cannot_open"